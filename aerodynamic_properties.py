@@ -1,3 +1,5 @@
+import instrumentation
+
 def calculate_dynamic_pressure(fluid_density, speed):
     """
     Calculate the dynamic pressure imparted on a solid moving through a fluid.
@@ -54,4 +56,8 @@ def calculate_reynolds_number(fluid_density, speed, len_characteristic, dynamic_
     float
         Reynolds number of the solid moving through the fluid.
     """
-    return fluid_density * speed * len_characteristic / dynamic_viscosity
\ No newline at end of file
+    return fluid_density * speed * len_characteristic / dynamic_viscosity
+
+
+# Opt-in call recording, see instrumentation.py
+instrumentation.register_module(__name__)
@@ -1,5 +1,19 @@
+import math
+from bisect import bisect_right
+
 import numpy as np
 import constants as con
+import instrumentation
+
+# Lookup table for dynamic viscosity, built once at import rather than on every call
+# Source: https://www.me.psu.edu/cimbala/me433/Links/Table_A_9_CC_Properties_of_Air.pdf (temperatures converted from Celsius to Kelvin)
+_viscosity_table_temps = np.array([173.15, 223.15, 233.15, 243.15, 253.15, 263.15, 273.15, 278.15, 283.15, 288.15, 293.15, 298.15, 303.15, 308.15, 313.15, 318.15, 323.15, 333.15, 343.15])
+_viscosity_table_values = np.array([1.189e-6, 1.474e-5, 1.527e-5, 1.579e-5, 1.630e-5, 1.680e-5, 1.729e-5, 1.754e-5, 1.778e-5, 1.802e-5, 1.825e-5, 1.849e-5, 1.872e-5, 1.895e-5, 1.918e-5, 1.941e-5, 1.963e-5, 2.008e-5, 2.052e-5])
+
+# Plain-float copies of the table for the scalar path, which is much faster with math and bisect than with numpy
+_viscosity_temps_list = _viscosity_table_temps.tolist()
+_viscosity_values_list = _viscosity_table_values.tolist()
+_viscosity_slopes_list = ((_viscosity_table_values[1:] - _viscosity_table_values[:-1]) / (_viscosity_table_temps[1:] - _viscosity_table_temps[:-1])).tolist()
 
 def temp_at_altitude(h, reference_temp, lapse_rate = con.T_lapse_rate):
     """
@@ -21,7 +35,7 @@ def temp_at_altitude(h, reference_temp, lapse_rate = con.T_lapse_rate):
     """
     return reference_temp + (h * lapse_rate)
 
-def pressure_at_altitude(h, reference_temp, reference_pressure, lapse_rate = con.T_lapse_rate, F_gravity = con.F_gravity):
+def pressure_at_altitude(h, reference_temp, reference_pressure, lapse_rate = con.T_lapse_rate, F_gravity = con.F_gravity, gravity_field = None, reference_altitude = 0):
     """
     Calculate the air pressure at a given altitude above a reference point.
 
@@ -34,18 +48,26 @@ def pressure_at_altitude(h, reference_temp, reference_pressure, lapse_rate = con
     reference_pressure : float
         Air pressure at the reference point in Pascals.
     lapse_rate : float, optional
-        Rate at which temperature decreases with increasing altitude in Kelvin per meter. Defaults to the standard lapse rate of 0.0065 K/m.
+        Change in temperature per meter of altitude in Kelvin per meter, negative when temperature decreases with altitude (same convention as temp_at_altitude). Defaults to the standard lapse rate of -0.0065 K/m.
     F_gravity : float, optional
         Magnitude of the force of gravity in Newtons. Defaults to the standard value of 9.80665 N.
+    gravity_field : GravityField, optional
+        If given, gravity varies with altitude according to this field: h is converted to a geopotential altitude and F_gravity is replaced by the gravity at the reference point. Defaults to None (constant gravity).
+    reference_altitude : float, optional
+        Altitude of the reference point above sea level in meters. Only used with gravity_field. Defaults to 0.
 
     Returns
     -------
     float
         Air pressure at the given altitude in Pascals.
     """
+    if gravity_field is not None:
+        h = gravity_field.geopotential_altitude(reference_altitude + h, reference_altitude)
+        F_gravity = gravity_field.gravity_at(reference_altitude)
+
     return reference_pressure * pow(
-        (1 - (h * lapse_rate / reference_temp)),
-        (F_gravity / (con.R_specific_air * lapse_rate))
+        (1 + (h * lapse_rate / reference_temp)),
+        (- F_gravity / (con.R_specific_air * lapse_rate))
     )
 
 def air_density_fn(pressure, temp):
@@ -105,12 +127,27 @@ def lookup_dynamic_viscosity(temp):
     Source of lookup table: https://www.me.psu.edu/cimbala/me433/Links/Table_A_9_CC_Properties_of_Air.pdf
     Temperatures converted from source (Celsius to Kelvin).
     """
-    # Lookup table for dynamic viscosity
-    temps = np.array([173.15, 223.15, 233.15, 243.15, 253.15, 263.15, 273.15, 278.15, 283.15, 288.15, 293.15, 298.15, 303.15, 308.15, 313.15, 318.15, 323.15, 333.15, 343.15])
-    viscosities = np.array([1.189e-6, 1.474e-5, 1.527e-5, 1.579e-5, 1.630e-5, 1.680e-5, 1.729e-5, 1.754e-5, 1.778e-5, 1.802e-5, 1.825e-5, 1.849e-5, 1.872e-5, 1.895e-5, 1.918e-5, 1.941e-5, 1.963e-5, 2.008e-5, 2.052e-5])
-    
-    # Interpolate to find dynamic viscosity at the given temperature
-    return np.interp(temp, temps, viscosities)
+    if isinstance(temp, (int, float)):
+        return _lookup_dynamic_viscosity_scalar(temp)
+    return np.interp(temp, _viscosity_table_temps, _viscosity_table_values)
+
+def _lookup_dynamic_viscosity_scalar(temp):
+    # Same arithmetic as np.interp, so the scalar and array paths give identical results
+    if temp >= _viscosity_temps_list[-1]:
+        return _viscosity_values_list[-1]
+    if temp < _viscosity_temps_list[0]:
+        return _viscosity_values_list[0]
+    if temp != temp:  # NaN
+        return temp
+    i = bisect_right(_viscosity_temps_list, temp) - 1
+    return _viscosity_slopes_list[i] * (temp - _viscosity_temps_list[i]) + _viscosity_values_list[i]
+
+def _viscosity_table_segment(temp):
+    # (lower temperature, upper temperature, slope, viscosity at lower temperature) of the lookup table segment containing temp, for callers that interpolate within one segment repeatedly
+    i = bisect_right(_viscosity_temps_list, temp) - 1
+    if 0 <= i < len(_viscosity_slopes_list):
+        return _viscosity_temps_list[i], _viscosity_temps_list[i + 1], _viscosity_slopes_list[i], _viscosity_values_list[i]
+    return 0.0, 0.0, 0.0, 0.0  # Outside of the table, matches no temperature
 
 def speed_of_sound(temp):
     """
@@ -126,7 +163,131 @@ def speed_of_sound(temp):
     float
         Speed of sound in meters per second.
     """
+    # math.sqrt raises for negative temperatures, which go through numpy to give nan like array inputs
+    if isinstance(temp, (int, float)) and temp >= 0:
+        return math.sqrt(con.adiabatic_index_air_times_R_specific_air * temp)
     return np.sqrt(con.adiabatic_index_air_times_R_specific_air * temp)
 
 
 # Humidity functions - these functions are primarily for interest, as for our project, it's not worth it to consider humidity's effect on air properties.
+
+def saturation_vapor_pressure(temp):
+    """
+    Calculate the saturation vapor pressure of water over a flat surface of liquid water.
+
+    Args
+    ----
+    temp : float or array_like
+        Temperature in Kelvin.
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Saturation vapor pressure in Pascals.
+
+    References
+    ----------
+    Magnus formula with the coefficients of Alduchov and Eskridge (1996), see constants.saturation_vapor_pressure_coefficients.
+    """
+    return _magnus_formula(con.saturation_vapor_pressure_coefficients[0], temp)
+
+def _magnus_formula(multiplier, temp):
+    # multiplier * exp(b * T_C / (T_C + c)): the saturation vapor pressure for a multiplier of a, and the vapor partial pressure for relative_humidity * a. The only copy of the formula, shared by Location and LocationEnsemble.
+    _, b, c = con.saturation_vapor_pressure_coefficients
+    if isinstance(temp, (int, float)):
+        temp_C = temp - 273.15
+        return multiplier * math.exp(b * temp_C / (temp_C + c))
+    temp_C = np.asarray(temp) - 273.15
+    return multiplier * np.exp(b * temp_C / (temp_C + c))
+
+def vapor_partial_pressure(relative_humidity, temp):
+    """
+    Calculate the partial pressure of water vapor in air.
+
+    Args
+    ----
+    relative_humidity : float or array_like
+        Relative humidity as a fraction (0 to 1, not a percentage).
+    temp : float or array_like
+        Temperature in Kelvin.
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Vapor partial pressure in Pascals.
+    """
+    return relative_humidity * saturation_vapor_pressure(temp)
+
+def virtual_temperature(temp, pressure, vapor_pressure):
+    """
+    Calculate the virtual temperature, the temperature at which dry air would have the same density as moist air at the same pressure.
+
+    Args
+    ----
+    temp : float or array_like
+        Temperature in Kelvin.
+    pressure : float or array_like
+        Total air pressure in Pascals.
+    vapor_pressure : float or array_like
+        Partial pressure of water vapor in Pascals (see vapor_partial_pressure).
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Virtual temperature in Kelvin.
+    """
+    return temp / (1 - (1 - con.MM_ratio_water_air) * vapor_pressure / pressure)
+
+def moist_air_density(pressure, temp, vapor_pressure):
+    """
+    Calculate the density of moist air, the sum of the densities of the dry air and the water vapor at their partial pressures.
+
+    Args
+    ----
+    pressure : float or array_like
+        Total air pressure in Pascals.
+    temp : float or array_like
+        Temperature in Kelvin.
+    vapor_pressure : float or array_like
+        Partial pressure of water vapor in Pascals (see vapor_partial_pressure).
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Air density in kilograms per cubic meter. Equal to air_density_fn when vapor_pressure is 0.
+    """
+    return (pressure - (1 - con.MM_ratio_water_air) * vapor_pressure) / (con.R_specific_air * temp)
+
+def moist_speed_of_sound(temp, pressure, vapor_pressure):
+    """
+    Calculate the speed of sound in moist air.
+
+    The gas constant and the specific heats of the mixture are the mass-weighted averages of those of dry air and water vapor, which gives the adiabatic index of the mixture.
+
+    Args
+    ----
+    temp : float or array_like
+        Temperature in Kelvin.
+    pressure : float or array_like
+        Total air pressure in Pascals.
+    vapor_pressure : float or array_like
+        Partial pressure of water vapor in Pascals (see vapor_partial_pressure).
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Speed of sound in meters per second. Equal to speed_of_sound when vapor_pressure is 0.
+    """
+    # Mass fraction of water vapor (specific humidity)
+    q = con.MM_ratio_water_air * vapor_pressure / (pressure - (1 - con.MM_ratio_water_air) * vapor_pressure)
+    R_mixture = con.R_specific_air + q * (con.R_specific_water_vapor - con.R_specific_air)
+    cp_mixture = con.cp_air + q * (con.cp_water_vapor - con.cp_air)
+    speed_squared = cp_mixture / (cp_mixture - R_mixture) * R_mixture * temp
+    # Scalar inputs give a float here; negative values go through numpy to give nan, as in speed_of_sound
+    if isinstance(speed_squared, float) and speed_squared >= 0:
+        return math.sqrt(speed_squared)
+    return np.sqrt(speed_squared)
+
+
+# Opt-in call recording, see instrumentation.py
+instrumentation.register_module(__name__)
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+import constants as con
+
+# Bump when the way profiles are calculated changes, so that old cache entries are no longer used
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("FEP_CACHE_DIR", Path.home() / ".cache" / "FlightEnvironmentProperties"))
+DEFAULT_MAX_BYTES = 512 * 1024**2
+
+# Age in seconds after which a staging or trash directory is assumed to be left behind by an interrupted process and is deleted
+_STALE_SECONDS = 3600
+
+# Number of times AtmosphereCache.profile tries to load an entry that other processes keep evicting before it calculates the profile without the cache
+_LOAD_ATTEMPTS = 3
+
+def _constants_fingerprint():
+    # Every public number (or tuple of numbers) in constants.py, so that editing any of them invalidates the cache
+    values = sorted((name, value) for name, value in vars(con).items() if not name.startswith("_") and isinstance(value, (int, float, tuple)))
+    return repr(values)
+
+def cache_key(location, altitudes, layered=False):
+    """
+    Calculate the cache key of the atmosphere profile of a location on an altitude grid.
+
+    Args
+    ----
+    location : Location
+        The location of the profile.
+    altitudes : numpy.ndarray
+        The altitude grid in meters above ground level.
+    layered : bool, optional
+        Whether the profile uses the layered atmosphere model. Defaults to False.
+
+    Returns
+    -------
+    str
+        A hex digest of the location's parameters, the altitude grid, the model options and the constants in constants.py.
+    """
+    altitudes = np.ascontiguousarray(altitudes, dtype=float)
+    # Converted to float because the repr of an int or a numpy scalar differs from that of an equal float
+    parameters = [float(value) for value in (location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, location.elevation, location.latitude, location.relative_humidity)]
+    digest = hashlib.sha256()
+    digest.update(repr((
+        CACHE_FORMAT_VERSION,
+        type(location).__name__,
+        *parameters,
+        bool(layered),
+        altitudes.shape,
+    )).encode())
+    digest.update(_constants_fingerprint().encode())
+    digest.update(altitudes.tobytes())
+    # A SoundingLocation's profile is defined by its samples, not only by the parameters above
+    for name in ("sounding_altitudes", "sounding_temperatures"):
+        if hasattr(location, name):
+            digest.update(np.ascontiguousarray(getattr(location, name)).tobytes())
+    return digest.hexdigest()
+
+class AtmosphereCache:
+    """
+    A content-addressed disk cache of atmosphere profiles, shared between processes.
+
+    Each entry is a directory of .npy files, one per property, named by the cache key. Entries are opened as read-only memory maps, so every process using the same entry shares one copy in the operating system's page cache. The least recently used entries are deleted when the cache grows over max_bytes.
+
+    Attributes
+    ----------
+    directory : pathlib.Path
+        The directory that the cache is stored in.
+    max_bytes : int
+        The maximum total size of the cache in bytes.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize an AtmosphereCache object.
+
+        Parameters
+        ----------
+        directory : str or path-like, optional
+            The directory to store the cache in. Created if it doesn't exist. The default is the FEP_CACHE_DIR environment variable, or ~/.cache/FlightEnvironmentProperties.
+        max_bytes : int, optional
+            The maximum total size of the cache in bytes. The default is 512 MiB.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def profile(self, location, altitudes, layered=False):
+        """
+        Get the atmosphere profile of a location from the cache, calculating and storing it first if it isn't cached.
+
+        Args
+        ----
+        location : Location
+            The location of the profile.
+        altitudes : array_like
+            The altitude grid in meters above ground level.
+        layered : bool, optional
+            Whether to use the layered atmosphere model. Defaults to False.
+
+        Returns
+        -------
+        dict
+            Read-only memory-mapped arrays, with the same keys as Location.atmosphere_profile.
+        """
+        altitudes = np.asarray(altitudes, dtype=float)
+        key = cache_key(location, altitudes, layered)
+        entry = self.directory / key
+
+        # Another process can evict the entry at any time, in which case it is calculated and stored again
+        for _ in range(_LOAD_ATTEMPTS):
+            if not entry.is_dir():
+                self._store(entry, location.atmosphere_profile(altitudes, layered=layered))
+                self._evict(keep=entry)
+            try:
+                # The modification time of the entry directory records when it was last used
+                os.utime(entry)
+                profile = {path.stem: np.load(path, mmap_mode="r") for path in entry.glob("*.npy")}
+            except FileNotFoundError:
+                continue
+            if profile:
+                return profile
+        # The cache is thrashing between processes, so skip it
+        return location.atmosphere_profile(altitudes, layered=layered)
+
+    def _store(self, entry, profile):
+        # Write to a temporary directory and rename it into place, so that other processes never see a partial entry
+        staging = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.directory))
+        try:
+            for name, values in profile.items():
+                np.save(staging / f"{name}.npy", values)
+            os.replace(staging, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not entry.is_dir():
+                raise
+
+    def entries(self):
+        """
+        List the cache entries, from least to most recently used.
+
+        Returns
+        -------
+        list of tuple
+            (path, size in bytes, last use time) of each entry.
+        """
+        entries = []
+        for entry in self.directory.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry.iterdir())
+                entries.append((entry, size, entry.stat().st_mtime))
+            except FileNotFoundError:
+                continue  # Evicted by another process
+        return sorted(entries, key=lambda item: item[2])
+
+    def _temporary_directories(self):
+        # (path, size in bytes, modification time) of the staging and trash directories, which are hidden from entries
+        directories = []
+        for directory in self.directory.glob(".tmp-*"):
+            try:
+                size = sum(path.stat().st_size for path in directory.iterdir())
+                directories.append((directory, size, directory.stat().st_mtime))
+            except FileNotFoundError:
+                continue  # Renamed into place or deleted by another process
+        return directories
+
+    def size(self):
+        """
+        Calculate the total size of the cache in bytes, including entries that are being written or deleted.
+        """
+        return sum(size for _, size, _ in self.entries()) + sum(size for _, size, _ in self._temporary_directories())
+
+    def _sweep(self):
+        # Delete staging and trash directories left behind by processes that were interrupted. Recent ones may still be in use by another process.
+        now = time.time()
+        for directory, _, modified in self._temporary_directories():
+            if now - modified > _STALE_SECONDS:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _evict(self, keep=None):
+        self._sweep()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            self._delete(entry)
+            total -= size
+
+    def _delete(self, entry):
+        # Rename the entry out of the way before deleting it, so that other processes never load part of an entry. A process that is loading it gets a FileNotFoundError instead.
+        trash = self.directory / f".tmp-{entry.name}-{uuid.uuid4().hex}"
+        try:
+            os.replace(entry, trash)
+        except OSError:
+            return  # Evicted by another process, or can't be moved right now and is left for a later eviction
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def clear(self):
+        """
+        Delete every entry in the cache, and any staging or trash directories left behind by interrupted processes.
+        """
+        for entry, _, _ in self.entries():
+            self._delete(entry)
+        self._sweep()
@@ -0,0 +1,145 @@
+from collections import namedtuple
+
+import constants as con
+import air_properties as ap
+
+AtmosphereState = namedtuple("AtmosphereState", ["altitude", "temperature", "pressure", "density", "speed_of_sound", "dynamic_viscosity"])
+AtmosphereState.__doc__ = """The atmospheric properties at one altitude above ground level, in the same units as Location.atmosphere_profile."""
+
+# Building the tuple directly skips the argument handling of the namedtuple constructor, which costs more than the arithmetic of an update
+_new_state = tuple.__new__
+
+class AtmosphereCursor:
+    """
+    A stateful view of the atmosphere at a Location, for integrators that query nearly the same altitude over and over.
+
+    The cursor keeps the exactly evaluated state at an anchor altitude. A query at the last queried altitude (common between the stages of a Runge-Kutta step) returns the cached state. A query close to the anchor is updated from the anchor with a second-order expansion of the power laws for pressure, density and speed of sound, instead of evaluating pow() from the ground reference. Any other query is evaluated exactly and becomes the new anchor. Updates are always made from the exact anchor rather than from the previous update, so errors don't accumulate.
+
+    Uses the troposphere model of the location (see Location.atmosphere_profile).
+
+    Attributes
+    ----------
+    location : Location
+        The location whose atmosphere is queried.
+    tolerance : float
+        Largest allowed relative error of an updated pressure, density or speed of sound against exact evaluation.
+    max_step : float
+        Largest distance in meters from the anchor altitude that is updated rather than evaluated exactly. Derived from tolerance.
+    hits : int
+        Number of queries answered from the cached state.
+    updates : int
+        Number of queries answered by updating the anchor state.
+    misses : int
+        Number of queries that needed an exact evaluation.
+    """
+    def __init__(self, location, tolerance=1e-9):
+        """
+        Initialize an AtmosphereCursor object.
+
+        Parameters
+        ----------
+        location : Location
+            The location whose atmosphere is queried.
+        tolerance : float, optional
+            Largest allowed relative error of an updated pressure, density or speed of sound against exact evaluation. Set to 0 to only use cached and exact results. The default is 1e-9.
+        """
+        if tolerance < 0:
+            raise ValueError("tolerance must be zero or positive")
+        self.location = location
+        self.tolerance = tolerance
+
+        # Pressure, density and speed of sound are proportional to (1 + x)^n, where x = lapse rate * (altitude - anchor altitude) / anchor temperature
+        self._pressure_exponent = location.density_exponent + 1
+        self._density_exponent = location.density_exponent
+        exponents = (self._pressure_exponent, self._density_exponent, 0.5)
+
+        # The truncation error of the second-order expansion is about |n (n - 1) (n - 2) / 6| |x|^3, halved here to leave room for the higher-order terms
+        largest_third_order_coefficient = max(abs(n * (n - 1) * (n - 2) / 6) for n in exponents)
+        self._max_x = (tolerance / (2 * largest_third_order_coefficient)) ** (1 / 3)
+        self.max_step = self._max_x * location.ground_temperature / abs(location.local_T_lapse_rate)
+
+        self._pressure_coefficients = (self._pressure_exponent, self._pressure_exponent * (self._pressure_exponent - 1) / 2)
+        self._density_coefficients = (self._density_exponent, self._density_exponent * (self._density_exponent - 1) / 2)
+
+        self._lapse_rate = location.local_T_lapse_rate
+        self._anchor = None
+        self._last = None
+        self._viscosity_segment = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        """
+        Set the hit, update and miss counters to zero.
+        """
+        self.hits = 0
+        self.updates = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """
+        Fraction of queries that didn't need an exact evaluation.
+        """
+        total = self.hits + self.updates + self.misses
+        return (self.hits + self.updates) / total if total else 0.0
+
+    def _exact(self, h):
+        location = self.location
+        temperature = location.ground_temperature + location.local_T_lapse_rate * h
+        density = location.density_multiplier * pow(temperature, location.density_exponent)
+        pressure = density * con.R_specific_air * temperature
+        state = _new_state(AtmosphereState, (h, temperature, pressure, density, ap.speed_of_sound(temperature), ap.lookup_dynamic_viscosity(temperature)))
+
+        # Segment of the viscosity lookup table that the anchor is in, so that updates within it can skip the table search
+        self._viscosity_segment = ap._viscosity_table_segment(temperature)
+        return state
+
+    def state(self, h):
+        """
+        Get the atmospheric state at an altitude.
+
+        Args
+        ----
+        h : float
+            Altitude above ground level in meters.
+
+        Returns
+        -------
+        AtmosphereState
+            The atmospheric properties at the altitude.
+        """
+        last = self._last
+        if last is not None and h == last[0]:
+            self.hits += 1
+            return last
+
+        anchor = self._anchor
+        if anchor is not None:
+            _, anchor_temperature, anchor_pressure, anchor_density, anchor_speed_of_sound, _ = anchor
+            lapse_step = self._lapse_rate * (h - anchor[0])
+            x = lapse_step / anchor_temperature
+            if -self._max_x <= x <= self._max_x:
+                self.updates += 1
+                x2 = x * x
+                temperature = anchor_temperature + lapse_step
+                pressure_coefficients = self._pressure_coefficients
+                density_coefficients = self._density_coefficients
+                low, high, slope, value = self._viscosity_segment
+                if low <= temperature < high:
+                    # Same arithmetic as lookup_dynamic_viscosity
+                    dynamic_viscosity = slope * (temperature - low) + value
+                else:
+                    dynamic_viscosity = ap.lookup_dynamic_viscosity(temperature)
+                self._last = _new_state(AtmosphereState, (
+                    h,
+                    temperature,
+                    anchor_pressure * (1 + pressure_coefficients[0] * x + pressure_coefficients[1] * x2),
+                    anchor_density * (1 + density_coefficients[0] * x + density_coefficients[1] * x2),
+                    anchor_speed_of_sound * (1 + 0.5 * x - 0.125 * x2),
+                    dynamic_viscosity,
+                ))
+                return self._last
+
+        self.misses += 1
+        self._anchor = self._last = self._exact(h)
+        return self._last
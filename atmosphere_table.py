@@ -0,0 +1,164 @@
+import numpy as np
+
+class AtmosphereTable:
+    """
+    A dense, uniformly spaced table of atmospheric properties at a Location, for cheap repeated queries.
+
+    The closed-form property functions are evaluated once on the grid at construction. Queries then cost one index calculation (grid spacing is uniform, so there is no search) plus a linear or cubic interpolation.
+
+    Attributes
+    ----------
+    location : Location
+        The location that the table was built from.
+    resolution : float
+        Spacing of the altitude grid in meters.
+    ceiling : float
+        Highest altitude above ground level in the grid, in meters.
+    kind : str
+        Interpolation method, either 'linear' or 'cubic'.
+    layered : bool
+        Whether the layered atmosphere model of the location was tabulated.
+    altitudes : numpy.ndarray
+        The altitude grid in meters above ground level.
+    values : dict
+        Tabulated property arrays, keyed like the dict returned by Location.atmosphere_profile.
+    max_error : dict
+        Worst-case absolute interpolation error of each property against the closed-form functions, in the units of that property.
+    max_relative_error : dict
+        Worst-case relative interpolation error of each property against the closed-form functions.
+    """
+    def __init__(self, location, resolution=10, ceiling=12000, kind="linear", layered=False):
+        """
+        Initialize an AtmosphereTable object.
+
+        Parameters
+        ----------
+        location : Location
+            The location to tabulate.
+        resolution : float, optional
+            Spacing of the altitude grid in meters. The default is 10.
+        ceiling : float, optional
+            Highest altitude above ground level to tabulate, in meters. Rounded up to a whole number of grid cells. The default is 12000.
+        kind : str, optional
+            Interpolation method, 'linear' or 'cubic' (cubic Hermite). The default is 'linear'.
+        layered : bool, optional
+            If True, tabulate the layered atmosphere model (see Location.atmosphere_profile). The default is False.
+
+        Notes
+        -----
+        Queries outside of [0, ceiling] extrapolate the first or last grid cell, so choose a ceiling above the highest altitude that will be queried.
+        """
+        if kind not in ("linear", "cubic"):
+            raise ValueError(f"kind must be 'linear' or 'cubic', not {kind!r}")
+        if resolution <= 0 or ceiling <= 0:
+            raise ValueError("resolution and ceiling must be positive")
+        if kind == "cubic" and ceiling <= resolution:
+            raise ValueError("cubic interpolation needs at least two grid cells, so ceiling must be greater than resolution")
+
+        self.location = location
+        self.resolution = resolution
+        self.kind = kind
+        self.layered = layered
+
+        n_cells = int(np.ceil(ceiling / resolution))
+        self.ceiling = n_cells * resolution
+        self.altitudes = np.arange(n_cells + 1) * resolution
+        self.values = location.atmosphere_profile(self.altitudes, layered=layered)
+
+        self._inverse_resolution = 1 / resolution
+        self._last_cell = n_cells - 1
+        # Slopes per grid cell (not per meter) for the cubic Hermite interpolant
+        self._slopes = {name: np.gradient(values, edge_order=2) for name, values in self.values.items()} if kind == "cubic" else None
+        # Plain lists make scalar queries much cheaper than indexing into numpy arrays
+        self._value_lists = {name: values.tolist() for name, values in self.values.items()}
+        self._slope_lists = {name: slopes.tolist() for name, slopes in self._slopes.items()} if kind == "cubic" else None
+
+        self.max_error, self.max_relative_error = self._measure_error()
+
+    def _measure_error(self):
+        # Probe several points inside every cell, where interpolation error is largest
+        offsets = np.array([0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875])
+        probes = (self.altitudes[:-1, np.newaxis] + offsets * self.resolution).ravel()
+        exact = self.location.atmosphere_profile(probes, layered=self.layered)
+
+        max_error = {}
+        max_relative_error = {}
+        for name in self.values:
+            error = np.abs(self.lookup(name, probes) - exact[name])
+            max_error[name] = float(error.max())
+            max_relative_error[name] = float((error / np.abs(exact[name])).max())
+        return max_error, max_relative_error
+
+    def lookup(self, name, altitudes):
+        """
+        Interpolate a tabulated property at one or more altitudes.
+
+        Args
+        ----
+        name : str
+            Name of the property, one of the keys of values.
+        altitudes : float or array_like
+            Altitudes above ground level in meters.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            The interpolated property at the given altitudes.
+        """
+        if isinstance(altitudes, (int, float)):
+            position = altitudes * self._inverse_resolution
+            # int() can't convert nan or inf, which the array path handles without raising
+            if position != position:
+                return float("nan")
+            if position <= 0:
+                i = 0
+            elif position >= self._last_cell:
+                i = self._last_cell
+            else:
+                i = int(position)
+            t = position - i
+            values = self._value_lists[name]
+            if self.kind == "linear":
+                return values[i] + t * (values[i + 1] - values[i])
+            slopes = self._slope_lists[name]
+            return _hermite(values[i], values[i + 1], slopes[i], slopes[i + 1], t)
+
+        position = np.asarray(altitudes, dtype=float) * self._inverse_resolution
+        i = np.clip(position.astype(np.intp), 0, self._last_cell)
+        t = position - i
+        values = self.values[name]
+        if self.kind == "linear":
+            y0 = values[i]
+            return y0 + t * (values[i + 1] - y0)
+        slopes = self._slopes[name]
+        return _hermite(values[i], values[i + 1], slopes[i], slopes[i + 1], t)
+
+    def temperature(self, altitudes):
+        """Temperature in Kelvin at altitudes above ground level in meters."""
+        return self.lookup("temperature", altitudes)
+
+    def pressure(self, altitudes):
+        """Pressure in Pascals at altitudes above ground level in meters."""
+        return self.lookup("pressure", altitudes)
+
+    def density(self, altitudes):
+        """Air density in kg/m^3 at altitudes above ground level in meters."""
+        return self.lookup("density", altitudes)
+
+    def speed_of_sound(self, altitudes):
+        """Speed of sound in m/s at altitudes above ground level in meters."""
+        return self.lookup("speed_of_sound", altitudes)
+
+    def dynamic_viscosity(self, altitudes):
+        """Dynamic viscosity in kg/(m*s) at altitudes above ground level in meters."""
+        return self.lookup("dynamic_viscosity", altitudes)
+
+    def gravity(self, altitudes):
+        """Local gravity in m/s^2 at altitudes above ground level in meters."""
+        return self.lookup("gravity", altitudes)
+
+def _hermite(y0, y1, m0, m1, t):
+    # Cubic Hermite basis on the unit interval, slopes given per grid cell
+    t2 = t * t
+    t3 = t2 * t
+    return (2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * m0 + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * m1
@@ -0,0 +1,506 @@
+"""Benchmarks and accuracy checks for the property functions.
+
+Run all benchmarks and save the results:
+
+    python benchmarks.py --output results.json
+
+Compare against an earlier run, exiting with status 1 if anything got slower by more than the threshold:
+
+    python benchmarks.py --output new.json --compare results.json --threshold 0.1
+
+Only run the accuracy checks:
+
+    python benchmarks.py --check-only
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+import constants as con
+import air_properties as ap
+import aerodynamic_properties as aero
+from gravity import GravityField, get_local_gravity
+from locations import Location, location_SAC
+from sounding import SoundingLocation
+from flow_state import FlowState
+from atmosphere_table import AtmosphereTable
+from location_ensemble import LocationEnsemble
+from atmosphere_cache import _STALE_SECONDS, AtmosphereCache, cache_key
+from site_registry import SiteRegistry, _haversine_distance
+from atmosphere_cursor import AtmosphereState
+
+SIZES = (1, 10, 1000, 100000, 10000000)
+
+# Largest size of the atmosphere_jacobian case, whose output is about 30 arrays of the input size (1.6 GB under tracemalloc at 10 million points). Its throughput is flat above this size since it works in blocks.
+_MAX_JACOBIAN_SIZE = 100000
+
+# Reference implementations, copied from the original closed-form code, that the faster paths are checked against
+
+def _reference_lookup_dynamic_viscosity(temp):
+    temps = np.array([173.15, 223.15, 233.15, 243.15, 253.15, 263.15, 273.15, 278.15, 283.15, 288.15, 293.15, 298.15, 303.15, 308.15, 313.15, 318.15, 323.15, 333.15, 343.15])
+    viscosities = np.array([1.189e-6, 1.474e-5, 1.527e-5, 1.579e-5, 1.630e-5, 1.680e-5, 1.729e-5, 1.754e-5, 1.778e-5, 1.802e-5, 1.825e-5, 1.849e-5, 1.872e-5, 1.895e-5, 1.918e-5, 1.941e-5, 1.963e-5, 2.008e-5, 2.052e-5])
+    return np.interp(temp, temps, viscosities)
+
+def _reference_speed_of_sound(temp):
+    return np.sqrt(con.adiabatic_index_air_times_R_specific_air * temp)
+
+def _reference_get_local_gravity(latitude, h=0):
+    latitude = np.abs(latitude)
+    phi = np.deg2rad(latitude)
+    gamma_0 = 9.780327 * (1 + 0.0052790414 * np.sin(phi)**2 + 0.0000232718 * np.sin(phi)**4 + 0.0000001262 * np.sin(phi)**6 + 0.0000000007 * np.sin(phi)**8)
+    return gamma_0 * (1 - (3.15704e-07 - 2.10269e-09 * np.sin(phi)**2) * h + 7.37452e-14 * h**2)
+
+def _chained_flow_state(location, h, speeds, len_characteristic):
+    # The flow properties along a trajectory from the separate property functions, the way FlowState's callers chained them before
+    temperature = ap.temp_at_altitude(h, location.ground_temperature, location.local_T_lapse_rate)
+    pressure = ap.pressure_at_altitude(h, location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, location.local_gravity)
+    density = ap.air_density_fn(pressure, temperature)
+    speed_of_sound = ap.speed_of_sound(temperature)
+    dynamic_viscosity = ap.lookup_dynamic_viscosity(temperature)
+    return {
+        "temperature": temperature,
+        "pressure": pressure,
+        "density": density,
+        "speed_of_sound": speed_of_sound,
+        "dynamic_viscosity": dynamic_viscosity,
+        "dynamic_pressure": aero.calculate_dynamic_pressure(density, speeds),
+        "mach_number": aero.calculate_mach_number(speeds, speed_of_sound),
+        "reynolds_number": aero.calculate_reynolds_number(density, speeds, len_characteristic, dynamic_viscosity),
+    }
+
+def _inputs(size, low, high, seed=0):
+    # A Python float for size 1 (the per-step integrator case), otherwise an array
+    if size == 1:
+        return (low + high) / 2
+    return np.random.default_rng(seed).uniform(low, high, size)
+
+def _benchmark_cases(size):
+    location = location_SAC
+    h = _inputs(size, 0, 10000)
+    temps = _inputs(size, 220, 320, seed=1)
+    pressures = _inputs(size, 20000, 90000, seed=2)
+    speeds = _inputs(size, 0, 600, seed=3)
+    densities = _inputs(size, 0.3, 1.2, seed=4)
+    viscosities = _inputs(size, 1.4e-5, 1.9e-5, seed=5)
+    sounds = _inputs(size, 290, 350, seed=6)
+    field = location.gravity_field
+    humid_location = Location(35, 86400, -0.00817, 1401, 32.99, relative_humidity=0.27)
+    sounding_altitudes = np.linspace(0, 15000, 31)
+    sounding_location = SoundingLocation(sounding_altitudes, 35 - 0.00817 * sounding_altitudes + np.sin(sounding_altitudes / 1000), 86400, 1401, 32.99)
+    sorted_h = np.sort(h) if size > 1 else h
+    flow_state_arrays = FlowState(location, h, speeds, 0.15).as_dict()
+    linear_table = AtmosphereTable(location, resolution=10, ceiling=12000)
+    cubic_table = AtmosphereTable(location, resolution=10, ceiling=12000, kind="cubic")
+    # An ensemble of up to 100 members sharing size / members altitudes, so that every size has the same number of results as the other cases
+    members = min(size, 100)
+    ensemble = LocationEnsemble.sample(members, ground_temperature=(25, 45), ground_pressure=(85000, 88000), local_T_lapse_rate=-0.00817, elevation=1401, latitude=32.99, seed=0)
+    ensemble_h = np.linspace(0, 10000, size // members)
+    relative_humidities = _inputs(size, 0, 1, seed=7)
+    vapor_pressures = _inputs(size, 0, 3000, seed=8)
+
+    cases = {
+        "air_properties.temp_at_altitude": lambda: ap.temp_at_altitude(h, location.ground_temperature, location.local_T_lapse_rate),
+        "air_properties.pressure_at_altitude": lambda: ap.pressure_at_altitude(h, location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, location.local_gravity),
+        "air_properties.air_density_fn": lambda: ap.air_density_fn(pressures, temps),
+        "air_properties.air_density_optimized": lambda: ap.air_density_optimized(temps, location.density_multiplier, location.density_exponent),
+        "air_properties.lookup_dynamic_viscosity": lambda: ap.lookup_dynamic_viscosity(temps),
+        "air_properties.speed_of_sound": lambda: ap.speed_of_sound(temps),
+        "gravity.get_local_gravity": lambda: get_local_gravity(location.latitude, h),
+        "gravity.GravityField.gravity_at": lambda: field.gravity_at(h),
+        "gravity.GravityField.geopotential_altitude": lambda: field.geopotential_altitude(location.elevation + h, location.elevation),
+        "air_properties.pressure_at_altitude[gravity_field]": lambda: ap.pressure_at_altitude(h, location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, gravity_field=field, reference_altitude=location.elevation),
+        "aerodynamic_properties.calculate_dynamic_pressure": lambda: aero.calculate_dynamic_pressure(densities, speeds),
+        "aerodynamic_properties.calculate_mach_number": lambda: aero.calculate_mach_number(speeds, sounds),
+        "aerodynamic_properties.calculate_reynolds_number": lambda: aero.calculate_reynolds_number(densities, speeds, 0.15, viscosities),
+        "Location.atmosphere_profile": lambda: location.atmosphere_profile(h),
+        "Location.atmosphere_profile[layered]": lambda: location.atmosphere_profile(h, layered=True),
+        "Location.atmosphere_profile[humid]": lambda: humid_location.atmosphere_profile(h),
+        "LocationEnsemble.atmosphere_profile": lambda: ensemble.atmosphere_profile(ensemble_h),
+        "AtmosphereTable.lookup": lambda: linear_table.lookup("pressure", h),
+        "AtmosphereTable.lookup[cubic]": lambda: cubic_table.lookup("pressure", h),
+        "SoundingLocation.atmosphere_profile": lambda: sounding_location.atmosphere_profile(h),
+        "SoundingLocation.atmosphere_profile[sorted]": lambda: sounding_location.atmosphere_profile(sorted_h),
+        "FlowState": lambda: FlowState(location, h, speeds, 0.15),
+        "FlowState[out]": lambda: FlowState(location, h, speeds, 0.15, out=flow_state_arrays),
+        "FlowState[chained functions]": lambda: _chained_flow_state(location, h, speeds, 0.15),
+        "air_properties.vapor_partial_pressure": lambda: ap.vapor_partial_pressure(relative_humidities, temps),
+        "air_properties.moist_air_density": lambda: ap.moist_air_density(pressures, temps, vapor_pressures),
+        "air_properties.moist_speed_of_sound": lambda: ap.moist_speed_of_sound(temps, pressures, vapor_pressures),
+    }
+    if size <= _MAX_JACOBIAN_SIZE:
+        cases["Location.atmosphere_jacobian"] = lambda: location.atmosphere_jacobian(h)
+    if size == 1:
+        cases["Location.__init__"] = lambda: Location(35, 86400, -0.00817, 1401, 32.99)
+    return cases
+
+def _time_call(function, min_time):
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    # autorange aims for 0.2 s; scale up to min_time and take the best of a few repeats to reduce noise
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+def _peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def run_benchmarks(sizes=SIZES, min_time=0.2, names=None):
+    """
+    Time every benchmark case at every input size.
+
+    Args
+    ----
+    sizes : iterable of int, optional
+        Input sizes. Size 1 uses Python floats, other sizes use arrays. Defaults to SIZES.
+    min_time : float, optional
+        Approximate time in seconds to spend timing each case. Defaults to 0.2.
+    names : iterable of str, optional
+        Only run the cases whose names contain one of these strings. Defaults to all cases.
+
+    Returns
+    -------
+    dict
+        Results keyed by 'name[size]', each with ns_per_call, elements_per_second and peak_memory_bytes.
+    """
+    results = {}
+    for size in sizes:
+        for name, function in _benchmark_cases(size).items():
+            if names and not any(part in name for part in names):
+                continue
+            seconds = _time_call(function, min_time)
+            results[f"{name}[{size}]"] = {
+                "name": name,
+                "size": size,
+                "ns_per_call": seconds * 1e9,
+                "elements_per_second": size / seconds,
+                "peak_memory_bytes": _peak_memory(function),
+            }
+            print(f"{name}[{size}]: {seconds * 1e9:,.0f} ns/call, {size / seconds:,.0f} elements/s", file=sys.stderr)
+    return results
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Find the benchmarks that got slower than a baseline run.
+
+    Args
+    ----
+    baseline : dict
+        Results of the baseline run, as returned by run_benchmarks or saved by save_results.
+    current : dict
+        Results of the current run.
+    threshold : float, optional
+        Allowed fractional slowdown before a benchmark counts as a regression. Defaults to 0.1 (10%).
+
+    Returns
+    -------
+    list of tuple
+        (key, baseline ns/call, current ns/call, fractional slowdown) of each regression.
+    """
+    regressions = []
+    for key, result in current.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]["ns_per_call"]
+        new = result["ns_per_call"]
+        slowdown = new / old - 1
+        if slowdown > threshold:
+            regressions.append((key, old, new, slowdown))
+    return regressions
+
+def save_results(results, path):
+    """
+    Save benchmark results to a JSON file, along with details of the machine they were run on.
+    """
+    document = {
+        "metadata": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+def load_results(path):
+    """
+    Load benchmark results saved by save_results.
+    """
+    with open(path) as file:
+        return json.load(file)["results"]
+
+def check_accuracy():
+    """
+    Check that the faster code paths return the same numbers as the closed-form implementations.
+
+    Returns
+    -------
+    list of str
+        A description of each failed check. Empty if every check passed.
+    """
+    failures = []
+
+    def check(name, actual, expected, rtol=0.0):
+        actual = np.asarray(actual, dtype=float)
+        expected = np.asarray(expected, dtype=float)
+        if rtol == 0.0:
+            passed = np.array_equal(actual, expected, equal_nan=True)
+        else:
+            passed = np.allclose(actual, expected, rtol=rtol, atol=0.0, equal_nan=True)
+        if not passed:
+            error = np.nanmax(np.abs(actual - expected) / np.abs(expected))
+            failures.append(f"{name}: max relative error {error:.3e} (allowed {rtol:.1e})")
+
+    rng = np.random.default_rng(0)
+    temps = np.concatenate([rng.uniform(150, 360, 10000), [173.15, 223.15, 288.15, 343.15, 100.0, 400.0]])
+    h = np.concatenate([rng.uniform(0, 12000, 10000), [0.0, 11000.0]])
+    location = location_SAC
+
+    # Scalar and array paths against the original implementations
+    check("lookup_dynamic_viscosity (array)", ap.lookup_dynamic_viscosity(temps), _reference_lookup_dynamic_viscosity(temps))
+    check("lookup_dynamic_viscosity (scalar)", [ap.lookup_dynamic_viscosity(float(t)) for t in temps], _reference_lookup_dynamic_viscosity(temps))
+    check("speed_of_sound (array)", ap.speed_of_sound(temps), _reference_speed_of_sound(temps))
+    check("speed_of_sound (scalar)", [ap.speed_of_sound(float(t)) for t in temps], _reference_speed_of_sound(temps))
+    for latitude in (0.0, 32.99, -47.987, 90.0):
+        check(f"get_local_gravity (latitude {latitude})", get_local_gravity(latitude, h), _reference_get_local_gravity(latitude, h))
+        check(f"GravityField.gravity_at (latitude {latitude})", GravityField(latitude).gravity_at(h), _reference_get_local_gravity(latitude, h))
+
+    # The fused profile against the scalar functions
+    profile = location.atmosphere_profile(h)
+    profile_temps = [ap.temp_at_altitude(float(x), location.ground_temperature, location.local_T_lapse_rate) for x in h]
+    check("atmosphere_profile temperature", profile["temperature"], profile_temps)
+    check("atmosphere_profile density", profile["density"], [ap.air_density_optimized(t, location.density_multiplier, location.density_exponent) for t in profile_temps], rtol=1e-14)
+    check("atmosphere_profile pressure", profile["pressure"], [ap.pressure_at_altitude(float(x), location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, location.local_gravity) for x in h], rtol=1e-14)
+    check("atmosphere_profile pressure (geopotential)", location.atmosphere_profile(h, geopotential=True)["pressure"], ap.pressure_at_altitude(h, location.ground_temperature, location.ground_pressure, location.local_T_lapse_rate, gravity_field=location.gravity_field, reference_altitude=location.elevation), rtol=1e-14)
+    check("atmosphere_profile ideal gas law", ap.air_density_fn(profile["pressure"], profile["temperature"]), profile["density"], rtol=1e-14)
+    check("atmosphere_profile speed_of_sound", profile["speed_of_sound"], _reference_speed_of_sound(np.array(profile_temps)))
+    check("atmosphere_profile dynamic_viscosity", profile["dynamic_viscosity"], _reference_lookup_dynamic_viscosity(np.array(profile_temps)))
+    check("atmosphere_profile gravity", profile["gravity"], _reference_get_local_gravity(location.latitude, location.elevation + h))
+
+    # Gravity is quadratic in altitude, so Simpson's rule integrates it exactly for the geopotential altitude
+    for latitude in (0.0, 32.99, -47.987, 90.0):
+        field = GravityField(latitude)
+        reference = 1401.0
+        top = reference + h
+        integral = h / 6 * (_reference_get_local_gravity(latitude, reference) + 4 * _reference_get_local_gravity(latitude, (reference + top) / 2) + _reference_get_local_gravity(latitude, top))
+        check(f"GravityField.geopotential_altitude (latitude {latitude})", field.geopotential_altitude(top, reference) + 1, integral / _reference_get_local_gravity(latitude, reference) + 1, rtol=1e-12)
+
+    # The layered model matches the troposphere model below the tropopause
+    troposphere = h < location.layer_base_altitudes[1]
+    layered = location.atmosphere_profile(h[troposphere], layered=True)
+    for name in ("temperature", "pressure", "density"):
+        check(f"layered {name} in the troposphere", layered[name], profile[name][troposphere], rtol=1e-12)
+
+    # Tabulated mode is within its reported error
+    for kind in ("linear", "cubic"):
+        table = location.tabulate(resolution=10, ceiling=12000, kind=kind)
+        for name in ("pressure", "density", "speed_of_sound"):
+            check(f"{kind} table {name}", table.lookup(name, h), profile[name], rtol=table.max_relative_error[name] * (1 + 1e-9))
+            check(f"{kind} table {name} (scalar)", [table.lookup(name, float(x)) for x in h], table.lookup(name, h))
+        non_finite = np.array([np.nan, np.inf, -np.inf])
+        with np.errstate(invalid="ignore"):
+            check(f"{kind} table non-finite (scalar)", [table.lookup("pressure", float(x)) for x in non_finite], table.lookup("pressure", non_finite))
+    location.table = None
+
+    # Humidity: the dry path is untouched at zero humidity, and the moist kernels reduce to the dry ones without vapor
+    pressures = profile["pressure"]
+    check("atmosphere_profile with relative_humidity 0", Location(35, 86400, -0.00817, 1401, 32.99, relative_humidity=0).atmosphere_profile(h)["density"], profile["density"])
+    check("moist_air_density without vapor", ap.moist_air_density(pressures, profile["temperature"], 0.0), ap.air_density_fn(pressures, profile["temperature"]), rtol=1e-15)
+    check("moist_speed_of_sound without vapor", ap.moist_speed_of_sound(profile["temperature"], pressures, 0.0), profile["speed_of_sound"], rtol=1e-15)
+    humid_location = Location(35, 86400, -0.00817, 1401, 32.99, relative_humidity=0.5)
+    humid = humid_location.atmosphere_profile(h)
+    vapor_pressures = ap.vapor_partial_pressure(0.5, humid["temperature"])
+    check("humid atmosphere_profile density", humid["density"], ap.moist_air_density(humid["pressure"], humid["temperature"], vapor_pressures), rtol=1e-14)
+    check("humid atmosphere_profile speed_of_sound", humid["speed_of_sound"], ap.moist_speed_of_sound(humid["temperature"], humid["pressure"], vapor_pressures), rtol=1e-14)
+
+    # A sounding sampled from a single lapse rate matches the closed form, an isothermal sounding matches the exponential decay of pressure, and sorted and unsorted altitudes give identical results
+    sounding_altitudes = np.linspace(0, 15000, 31)
+    sounding = SoundingLocation(sounding_altitudes, location.ground_temperature - 273.15 + location.local_T_lapse_rate * sounding_altitudes, location.ground_pressure, location.elevation, location.latitude)
+    for name in ("temperature", "pressure", "density"):
+        check(f"linear sounding {name}", sounding.atmosphere_profile(h)[name], profile[name], rtol=1e-12)
+    isothermal = SoundingLocation(sounding_altitudes, np.full(sounding_altitudes.shape, 15.0), location.ground_pressure, location.elevation, location.latitude)
+    check("isothermal sounding pressure", isothermal.atmosphere_profile(h)["pressure"], location.ground_pressure * np.exp(- isothermal.local_gravity * h / (con.R_specific_air * 288.15)), rtol=1e-12)
+    order = np.argsort(h)
+    for name, values in sounding.atmosphere_profile(h[order]).items():
+        check(f"sounding {name} (sorted altitudes)", values, sounding.atmosphere_profile(h)[name][order])
+
+    # FlowState against atmosphere_profile and the functions in aerodynamic_properties, and its memory use against chaining the functions
+    speeds = rng.uniform(0, 600, h.shape)
+    flow_state = FlowState(location, h, speeds, 0.15)
+    expected = dict(profile)
+    expected["dynamic_pressure"] = aero.calculate_dynamic_pressure(profile["density"], speeds)
+    expected["mach_number"] = aero.calculate_mach_number(speeds, profile["speed_of_sound"])
+    expected["reynolds_number"] = aero.calculate_reynolds_number(profile["density"], speeds, 0.15, profile["dynamic_viscosity"])
+    for name in FlowState.FIELDS:
+        check(f"FlowState {name}", getattr(flow_state, name), expected[name], rtol=1e-15)
+    arrays = flow_state.as_dict()
+    flow_state_peak = _peak_memory(lambda: FlowState(location, h, speeds, 0.15, out=arrays))
+    chained_peak = _peak_memory(lambda: _chained_flow_state(location, h, speeds, 0.15))
+    if flow_state_peak * 2 > chained_peak:
+        failures.append(f"FlowState with out arrays: peak memory {flow_state_peak} bytes, more than half of the {chained_peak} bytes of chaining the functions")
+
+    # Every member of an ensemble, dry or humid, matches the equivalent Location
+    members = [Location(rng.uniform(25, 45), rng.uniform(85000, 88000), rng.uniform(-0.0098, -0.004), rng.uniform(0, 2000), rng.uniform(-60, 60), rng.uniform(0, 0.8) if i % 2 else 0) for i in range(20)]
+    ensemble_profile = LocationEnsemble.from_locations(members).atmosphere_profile(h)
+    for i, member in enumerate(members):
+        member_profile = member.atmosphere_profile(h)
+        for name in member_profile:
+            check(f"LocationEnsemble member {i} {name}", ensemble_profile[name][i], member_profile[name], rtol=1e-14)
+
+    # Closed-form derivatives against central differences
+    values, jacobians = location.atmosphere_jacobian(h)
+    for name in values:
+        check(f"atmosphere_jacobian {name}", values[name], profile[name], rtol=1e-14)
+    step = 1e-2
+    upper, lower = location.atmosphere_profile(h + step), location.atmosphere_profile(h - step)
+    for name in values:
+        check(f"atmosphere_jacobian d{name}/dh", jacobians[name][0], (upper[name] - lower[name]) / (2 * step), rtol=1e-6)
+
+    # AtmosphereCursor stays within its tolerance on a random walk of small and large steps, as an integrator would query it
+    for tolerance in (1e-9, 1e-6):
+        cursor = location.cursor(tolerance)
+        steps = rng.choice([0.0, 0.01, 1.0, 50.0, 2000.0], size=20000, p=[0.2, 0.3, 0.3, 0.15, 0.05]) * rng.choice([-1.0, 1.0], size=20000)
+        walk = np.clip(np.cumsum(steps) + 3000, 0, 12000)
+        states = np.array([cursor.state(float(x)) for x in walk])
+        exact = location.atmosphere_profile(walk)
+        for i, name in enumerate(AtmosphereState._fields):
+            if name in ("pressure", "density", "speed_of_sound"):
+                check(f"AtmosphereCursor {name} (tolerance {tolerance:g})", states[:, i], exact[name], rtol=tolerance)
+        if cursor.updates == 0:
+            failures.append(f"AtmosphereCursor (tolerance {tolerance:g}): no query was answered by an update")
+
+    # AtmosphereCache: equal parameters of any numeric type share a key, the least recently used entries are evicted first down to max_bytes, evicted entries are recalculated, and stale temporary directories are swept
+    check_cache(failures)
+
+    # SiteRegistry searches against brute force, with sites and queries near the poles and the antimeridian
+    check_site_registry(failures)
+
+    # Barometric inversion round trip
+    check("altitude_at_pressure round trip", location.altitude_at_pressure(profile["pressure"]) + 1, h + 1, rtol=1e-12)
+
+    return failures
+
+def check_cache(failures):
+    """
+    Check the key normalization, eviction and cleanup of AtmosphereCache on a temporary directory, appending a description of each failed check to failures.
+    """
+    grid = np.linspace(0, 10000, 1001)
+    if cache_key(Location(np.float64(35), np.int64(86400), np.float32(-0.0065), 1401, 32.99), grid) != cache_key(Location(35.0, 86400.0, float(np.float32(-0.0065)), 1401.0, 32.99), grid):
+        failures.append("AtmosphereCache: equal parameters of different numeric types have different keys")
+
+    locations = [Location(temperature, 86400, -0.00817, 1401, 32.99) for temperature in (25, 30, 35)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AtmosphereCache(directory)
+        first = cache.profile(locations[0], grid)
+        entry_size = cache.size()
+        # Room for two entries
+        cache.max_bytes = 2 * entry_size + entry_size // 2
+
+        now = time.time()
+        cache.profile(locations[1], grid)
+        os.utime(cache.directory / cache_key(locations[1], grid), (now - 20, now - 20))
+        os.utime(cache.directory / cache_key(locations[0], grid), (now - 30, now - 30))
+        cache.profile(locations[0], grid)  # Now the most recently used
+        cache.profile(locations[2], grid)
+        cached = {entry.name for entry, _, _ in cache.entries()}
+        if cached != {cache_key(locations[0], grid), cache_key(locations[2], grid)}:
+            failures.append("AtmosphereCache: the least recently used entry wasn't the one evicted")
+        if cache.size() > cache.max_bytes:
+            failures.append(f"AtmosphereCache: size {cache.size()} bytes is over max_bytes {cache.max_bytes}")
+
+        # An entry evicted by another process is calculated again
+        cache._delete(cache.directory / cache_key(locations[0], grid))
+        again = cache.profile(locations[0], grid)
+        if not all(np.array_equal(again[name], first[name]) for name in first):
+            failures.append("AtmosphereCache: an evicted entry was recalculated differently")
+
+        # Stale temporary directories count towards the size until they are swept, and recent ones are left alone
+        stale = cache.directory / ".tmp-stale"
+        recent = cache.directory / ".tmp-recent"
+        for path in (stale, recent):
+            path.mkdir()
+            np.save(path / "pressure.npy", grid)
+        os.utime(stale, (now - 2 * _STALE_SECONDS, now - 2 * _STALE_SECONDS))
+        if cache.size() != sum(size for _, size, _ in cache.entries()) + 2 * (stale / "pressure.npy").stat().st_size:
+            failures.append("AtmosphereCache: size() doesn't count the temporary directories")
+        cache.clear()
+        if stale.exists() or not recent.exists() or cache.entries():
+            failures.append("AtmosphereCache: clear() didn't delete the entries and only the stale temporary directories")
+
+def check_site_registry(failures, n_sites=20000, n_queries=100):
+    """
+    Check SiteRegistry.nearest and SiteRegistry.within against a brute-force search over every site, appending a description of each failed check to failures.
+    """
+    rng = np.random.default_rng(1)
+    # Uniform over the sphere, plus clusters near both poles and on both sides of the antimeridian
+    latitudes = np.concatenate([np.degrees(np.arcsin(rng.uniform(-1, 1, n_sites - 3000))), rng.uniform(85, 90, 1000), rng.uniform(-90, -85, 1000), rng.uniform(-60, 60, 1000)])
+    longitudes = np.concatenate([rng.uniform(-180, 180, n_sites - 1000), rng.choice([-1.0, 1.0], 1000) * rng.uniform(179, 180, 1000)])
+    registry = SiteRegistry({f"site{i}": {"latitude": latitude, "longitude": longitude} for i, (latitude, longitude) in enumerate(zip(latitudes.tolist(), longitudes.tolist()))})
+    keys = np.array(list(registry), dtype=object)
+
+    query_latitudes = np.concatenate([rng.uniform(-90, 90, n_queries - 4), [89.99, -89.99, 0.0, 45.0]])
+    query_longitudes = np.concatenate([rng.uniform(-180, 180, n_queries - 4), [0.0, 90.0, 179.99, -179.99]])
+    for latitude, longitude in zip(query_latitudes.tolist(), query_longitudes.tolist()):
+        distances = _haversine_distance(np.radians(latitude), np.radians(longitude), np.radians(latitudes), np.radians(longitudes))
+        order = np.argsort(distances)
+
+        for k in (1, 5):
+            nearest = registry.nearest(latitude, longitude, k)
+            if [key for key, _ in nearest] != keys[order[:k]].tolist() or not np.allclose([distance for _, distance in nearest], distances[order[:k]], rtol=1e-12, atol=0.0):
+                failures.append(f"SiteRegistry.nearest (k={k}) at ({latitude:.2f}, {longitude:.2f}) doesn't match brute force")
+
+        for radius in (50.0, 500.0):
+            inside = order[:np.searchsorted(distances[order], radius, side="right")]
+            if [key for key, _ in registry.within(latitude, longitude, radius)] != keys[inside].tolist():
+                failures.append(f"SiteRegistry.within ({radius:g} km) at ({latitude:.2f}, {longitude:.2f}) doesn't match brute force")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the property functions, scalar vs batch, and check their accuracy.")
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="JSON file of baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed fractional slowdown against the baseline (default: 0.1)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help=f"input sizes (default: {' '.join(map(str, SIZES))})")
+    parser.add_argument("--min-time", type=float, default=0.2, help="approximate seconds to spend timing each case (default: 0.2)")
+    parser.add_argument("--filter", nargs="+", help="only run cases whose names contain one of these strings")
+    parser.add_argument("--check-only", action="store_true", help="only run the accuracy checks")
+    args = parser.parse_args()
+
+    failures = check_accuracy()
+    for failure in failures:
+        print(f"ACCURACY CHECK FAILED: {failure}", file=sys.stderr)
+    if not failures:
+        print("All accuracy checks passed", file=sys.stderr)
+    if args.check_only:
+        return 1 if failures else 0
+
+    results = run_benchmarks(args.sizes, args.min_time, args.filter)
+    if args.output:
+        save_results(results, args.output)
+
+    status = 1 if failures else 0
+    if args.compare:
+        regressions = compare_results(load_results(args.compare), results, args.threshold)
+        for key, old, new, slowdown in regressions:
+            print(f"REGRESSION: {key}: {old:,.0f} -> {new:,.0f} ns/call ({slowdown:+.1%})", file=sys.stderr)
+        if regressions:
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
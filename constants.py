@@ -1,6 +1,7 @@
 # Constants
 R_universal = 8.3144598  # universal gas constant, J/(mol*K)
 MM_air = 0.0289644  # molar mass of air, kg/mol
+MM_water = 0.01801528  # molar mass of water, kg/mol
 adiabatic_index_air = 1.4  # unitless
 """Notes on adiabatic index (also known as the heat capacity ratio or ratio of specific heats (cp/cv)) for air
 
@@ -23,9 +24,24 @@ As a function of teperature, for dry air, the adiabatic index according to diffe
 The value of 1.4 is a very good approximation for the temperature ranges that most hobbyist or collegiate team rockets will experience.
 """
 
+adiabatic_index_water_vapor = 1.33  # unitless
+"""Notes on adiabatic index for water vapor
+
+Water vapor is a nonlinear triatomic molecule, so its ideal value is 4/3. Measured values near room temperature are about 1.33 (https://www.engineeringtoolbox.com/specific-heat-capacity-gases-d_159.html). Vapor is at most a few percent of the mass of air at the temperatures rockets fly in, so the exact value barely matters.
+"""
+saturation_vapor_pressure_coefficients = (610.94, 17.625, 243.04)  # Pa, unitless, deg C
+"""Notes on the saturation vapor pressure of water
+
+The Magnus formula e_s = a * exp(b * T / (T + c)), with T in degrees Celsius and the coefficients of Alduchov and Eskridge (1996), https://doi.org/10.1175/1520-0450(1996)035<0601:IMFAOS>2.0.CO;2. The relative error is under 0.4% from -40 to 50 deg C over liquid water.
+"""
+
 # Derived constants
 R_specific_air = R_universal / MM_air  # J/(kg*K)
 adiabatic_index_air_times_R_specific_air = adiabatic_index_air * R_specific_air  # J/(kg*K)
+R_specific_water_vapor = R_universal / MM_water  # J/(kg*K)
+MM_ratio_water_air = MM_water / MM_air  # unitless, about 0.622
+cp_air = adiabatic_index_air * R_specific_air / (adiabatic_index_air - 1)  # specific heat at constant pressure, J/(kg*K)
+cp_water_vapor = adiabatic_index_water_vapor * R_specific_water_vapor / (adiabatic_index_water_vapor - 1)  # specific heat at constant pressure, J/(kg*K)
 
 # Conversion factors
 ft_to_m_conversion = 0.3048  # m/ft
@@ -33,4 +49,13 @@ m_to_ft_conversion = 1/ft_to_m_conversion  # ft/m
 
 # Default launch site values. Specific launch site values can be set at initialization of the Location class.
 F_gravity = 9.80665  # m/s^2
-T_lapse_rate = -0.0065  # K/m
\ No newline at end of file
+T_lapse_rate = -0.0065  # K/m
+# Layers of the U.S. Standard Atmosphere 1976, up to the top of the mesosphere (84.852 km).
+US_standard_atmosphere_layer_base_altitudes = (0, 11000, 20000, 32000, 47000, 51000, 71000)  # m above sea level (geopotential)
+US_standard_atmosphere_layer_lapse_rates = (-0.0065, 0.0, 0.001, 0.0028, 0.0, -0.0028, -0.002)  # K/m
+"""Notes on the layers of the U.S. Standard Atmosphere 1976
+
+Source: https://ntrs.nasa.gov/citations/19770009539
+
+The first layer (the troposphere) is replaced by a Location's own lapse rate when the layered model is used, so only the breakpoints and the lapse rates of the layers above the tropopause are taken from the standard. The last layer is assumed to continue above its top at 84852 m.
+"""
@@ -0,0 +1,102 @@
+import os
+from itertools import islice
+
+import numpy as np
+
+def read_csv_chunks(path, columns, chunk_size=100000, delimiter=","):
+    """
+    Read columns of a CSV flight log in fixed-size chunks, so that memory use doesn't grow with the size of the log.
+
+    Args
+    ----
+    path : str or path-like
+        Path to the CSV file. The first line must be a header with the column names.
+    columns : list of str
+        Names of the columns to read. Every column must be numeric.
+    chunk_size : int, optional
+        Number of rows per chunk. Defaults to 100000.
+    delimiter : str, optional
+        Column delimiter. Defaults to ','.
+
+    Yields
+    ------
+    dict
+        Arrays of up to chunk_size rows, keyed by column name.
+    """
+    with open(path) as file:
+        header = [name.strip() for name in file.readline().split(delimiter)]
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise KeyError(f"columns {missing} not found in the header of {path}")
+        indices = [header.index(name) for name in columns]
+
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                return
+            # Blank lines at the end of a log can fill a whole batch, which np.loadtxt would warn about
+            if not any(line.strip() for line in lines):
+                continue
+            data = np.loadtxt(lines, delimiter=delimiter, usecols=indices, ndmin=2)
+            yield {name: data[:, i] for i, name in enumerate(columns)}
+
+def read_binary_chunks(path, dtype, chunk_size=1000000, offset=0):
+    """
+    Read a binary flight log of fixed-size records in chunks, through a memory-mapped file.
+
+    Only the pages of the chunk being processed are read from disk, so logs larger than the available memory can be processed.
+
+    Args
+    ----
+    path : str or path-like
+        Path to the binary file.
+    dtype : numpy.dtype
+        Structured dtype of one record, e.g. np.dtype([('time', '<f8'), ('pressure', '<f4')]).
+    chunk_size : int, optional
+        Number of records per chunk. Defaults to 1000000.
+    offset : int, optional
+        Number of bytes to skip at the start of the file, e.g. for a file header. Defaults to 0.
+
+    Yields
+    ------
+    dict
+        Arrays of up to chunk_size records, keyed by field name. These are views into the memory-mapped file, so copy them to keep them after the next chunk is read.
+    """
+    # np.memmap can't map an empty file, or nothing after the offset
+    if os.path.getsize(path) <= offset:
+        return
+    records = np.memmap(path, dtype=dtype, mode="r", offset=offset)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        yield {name: chunk[name] for name in chunk.dtype.names}
+
+def reconstruct_flight(location, chunks, pressure_column="pressure", speed_column=None, pressure_scale=1, layered=False):
+    """
+    Reconstruct altitude, temperature, density and (optionally) Mach number from chunks of logged barometric pressure.
+
+    Args
+    ----
+    location : Location
+        The location of the launch. Logged pressures at the pad should match location.ground_pressure.
+    chunks : iterable of dict
+        Chunks of log data, such as those yielded by read_csv_chunks or read_binary_chunks.
+    pressure_column : str, optional
+        Name of the pressure column. Defaults to 'pressure'.
+    speed_column : str, optional
+        Name of the airspeed column in m/s, for calculating the Mach number. Defaults to None.
+    pressure_scale : float, optional
+        Factor that converts the logged pressure to Pascals, e.g. 100 for hPa. Defaults to 1.
+    layered : bool, optional
+        If True, use the layered atmosphere model. Defaults to False.
+
+    Yields
+    ------
+    dict
+        The input chunk, with the keys of Location.barometric_state added.
+    """
+    for chunk in chunks:
+        pressures = chunk[pressure_column]
+        if pressure_scale != 1:
+            pressures = pressures * pressure_scale
+        speeds = chunk[speed_column] if speed_column is not None else None
+        yield {**chunk, **location.barometric_state(pressures, speeds, layered)}
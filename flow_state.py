@@ -0,0 +1,111 @@
+import numpy as np
+
+import constants as con
+import air_properties as ap
+
+# Number of samples processed at a time along 1-D trajectories
+_BLOCK_SIZE = 1 << 16
+
+class FlowState:
+    """
+    The atmospheric and flow properties along a trajectory, calculated together in one pass.
+
+    Compared with calling the functions in air_properties and aerodynamic_properties one after another, every property is written directly into its output array and intermediate results are reused, so far fewer temporary arrays are allocated. 1-D trajectories are processed in cache-sized blocks, and with preallocated out arrays the only allocations are small per-block temporaries for the viscosity lookup.
+
+    Attributes
+    ----------
+    altitude : numpy.ndarray
+        Altitudes above ground level in meters.
+    speed : numpy.ndarray
+        Airspeeds in m/s.
+    temperature : numpy.ndarray
+        Temperature in Kelvin.
+    pressure : numpy.ndarray
+        Pressure in Pascals.
+    density : numpy.ndarray
+        Air density in kg/m^3.
+    speed_of_sound : numpy.ndarray
+        Speed of sound in m/s.
+    dynamic_viscosity : numpy.ndarray
+        Dynamic viscosity in kg/(m*s).
+    dynamic_pressure : numpy.ndarray
+        Dynamic pressure in Pascals.
+    mach_number : numpy.ndarray
+        Mach number.
+    reynolds_number : numpy.ndarray
+        Reynolds number, based on the characteristic length.
+    """
+    FIELDS = ("temperature", "pressure", "density", "speed_of_sound", "dynamic_viscosity", "dynamic_pressure", "mach_number", "reynolds_number")
+
+    def __init__(self, location, altitudes, speeds, len_characteristic, out=None, layered=False):
+        """
+        Initialize a FlowState object, calculating every property.
+
+        Parameters
+        ----------
+        location : Location
+            The location of the flight.
+        altitudes : array_like
+            Altitudes above ground level in meters.
+        speeds : array_like
+            Airspeeds in m/s, same shape as altitudes.
+        len_characteristic : float
+            Characteristic length of the rocket for the Reynolds number, in meters.
+        out : dict, optional
+            Preallocated float64 arrays to write the results into, keyed by the names in FIELDS. Any subset of the names can be given; missing arrays are allocated. Reusing the arrays of a previous FlowState (see as_dict) avoids allocating them again for the next trajectory of the same length.
+        layered : bool, optional
+            If True, use the layered atmosphere model. The default is False.
+        """
+        self.altitude = np.asarray(altitudes, dtype=float)
+        self.speed = np.asarray(speeds, dtype=float)
+        if self.altitude.shape != self.speed.shape:
+            raise ValueError(f"altitudes and speeds must have the same shape, not {self.altitude.shape} and {self.speed.shape}")
+
+        out = {} if out is None else out
+        for name in self.FIELDS:
+            setattr(self, name, out[name] if name in out else np.empty(self.altitude.shape))
+
+        # Work through 1-D trajectories in blocks, so that intermediate results stay in the CPU cache and temporaries stay small
+        if self.altitude.ndim == 1:
+            blocks = [slice(start, start + _BLOCK_SIZE) for start in range(0, self.altitude.size, _BLOCK_SIZE)]
+        else:
+            blocks = [...]
+        for block in blocks:
+            self._calculate(location, block, len_characteristic, layered)
+
+    def _calculate(self, location, block, len_characteristic, layered):
+        speed = self.speed[block]
+        temperature = self.temperature[block]
+        density = self.density[block]
+        speed_of_sound = self.speed_of_sound[block]
+        dynamic_viscosity = self.dynamic_viscosity[block]
+
+        # In humid air, the speed of sound array holds the vapor pressure until the speed of sound is calculated from it
+        location.thermodynamic_state(self.altitude[block], temperature, self.pressure[block], density, layered, vapor_pressure=speed_of_sound if location.relative_humidity else None)
+
+        if location.relative_humidity:
+            speed_of_sound[...] = ap.moist_speed_of_sound(temperature, self.pressure[block], speed_of_sound)
+        else:
+            np.multiply(temperature, con.adiabatic_index_air_times_R_specific_air, out=speed_of_sound)
+            np.sqrt(speed_of_sound, out=speed_of_sound)
+
+        dynamic_viscosity[...] = ap.lookup_dynamic_viscosity(temperature)
+
+        # Same formulas as calculate_dynamic_pressure, calculate_mach_number and calculate_reynolds_number, done in place
+        dynamic_pressure = self.dynamic_pressure[block]
+        np.multiply(speed, speed, out=dynamic_pressure)
+        dynamic_pressure *= density
+        dynamic_pressure *= 0.5
+
+        np.divide(speed, speed_of_sound, out=self.mach_number[block])
+
+        reynolds_number = self.reynolds_number[block]
+        np.multiply(density, speed, out=reynolds_number)
+        reynolds_number *= len_characteristic
+        reynolds_number /= dynamic_viscosity
+
+    def as_dict(self):
+        """
+        Return the calculated properties as a dict keyed by the names in FIELDS.
+        """
+        return {name: getattr(self, name) for name in self.FIELDS}
@@ -1,5 +1,31 @@
 import numpy as np
 
+import instrumentation
+
+# Coefficients for the gravity formula for the Earth as an oblate spheroid
+gamma_a = 9.780327  # m/s^2
+c1 = 0.0052790414
+c2 = 0.0000232718
+c3 = 0.0000001262
+c4 = 0.0000000007
+
+# Coefficients for the free air correction (the correction for the height above sea level)
+k1 = 3.15704e-07  # 1/m
+k2 = 2.10269e-09  # 1/m
+k3 = 7.37452e-14  # 1/m^2
+
+def _gravity_coefficients(latitude):
+    # Returns gamma_0 (gravity at sea level) and the linear coefficient of the free air correction, which only depend on latitude
+    latitude = np.abs(latitude) # The formula is symmetric about the equator (like the oblate spheroid Earth)
+
+    phi = np.deg2rad(latitude)
+    sin_phi = np.sin(phi)
+
+    gamma_0 = gamma_a * (1 + c1 * sin_phi**2 + c2 * sin_phi**4 + c3 * sin_phi**6 + c4 * sin_phi**8)
+    free_air_linear = k1 - k2 * sin_phi**2
+
+    return gamma_0, free_air_linear
+
 def get_local_gravity(latitude, h = 0):
     """
     Calculate the acceleration due to gravity at a given latitude and altitude above sea level.
@@ -20,22 +46,87 @@ def get_local_gravity(latitude, h = 0):
     ----------
     Based on the International Gravity Formula 1980 (IGF80) model, as outlined in https://en.wikipedia.org/wiki/Theoretical_gravity#International_gravity_formula_1980
     """
-    latitude = np.abs(latitude) # The formula is symmetric about the equator (like the oblate spheroid Earth)
+    gamma_0, free_air_linear = _gravity_coefficients(latitude)
 
-    phi = np.deg2rad(latitude)
+    return gamma_0 * (1 - free_air_linear * h + k3 * h**2)
+
+class GravityField:
+    """
+    The gravity field at a fixed latitude, with the latitude-dependent terms of get_local_gravity precomputed so that gravity at any altitude is a single quadratic evaluation.
+
+    Attributes
+    ----------
+    latitude : float
+        Latitude in degrees.
+    gamma_0 : float
+        Acceleration due to gravity at sea level at this latitude in m/s^2.
+    free_air_linear : float
+        Linear coefficient of the free air correction at this latitude in 1/m.
+    free_air_quadratic : float
+        Quadratic coefficient of the free air correction in 1/m^2.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses defined while instrumentation is recording are instrumented too, see instrumentation.py
+        instrumentation.register_subclass(cls)
+
+    def __init__(self, latitude):
+        """
+        Initialize a GravityField object.
+
+        Parameters
+        ----------
+        latitude : float
+            Latitude in degrees.
+        """
+        self.latitude = latitude
+
+        gamma_0, free_air_linear = _gravity_coefficients(latitude)
+        # Plain floats keep scalar evaluations free of numpy overhead
+        self.gamma_0 = float(gamma_0)
+        self.free_air_linear = float(free_air_linear)
+        self.free_air_quadratic = k3
+
+    def gravity_at(self, h):
+        """
+        Calculate the acceleration due to gravity at an altitude above sea level. Gives the same result as get_local_gravity.
+
+        Args
+        ----
+        h : float or array_like
+            Altitude above sea level in meters.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Acceleration due to gravity in meters per second squared.
+        """
+        return self.gamma_0 * (1 - self.free_air_linear * h + self.free_air_quadratic * h**2)
+
+    def geopotential_altitude(self, h, reference_altitude=0):
+        """
+        Convert a geometric altitude to a geopotential altitude, measured from a reference altitude.
+
+        The geopotential altitude is the height that gives the same change in gravitational potential energy with gravity held constant at its value at the reference altitude. Using it (with that constant gravity) in the closed-form pressure and density functions accounts for gravity decreasing with altitude.
+
+        Args
+        ----
+        h : float or array_like
+            Altitude above sea level in meters.
+        reference_altitude : float, optional
+            Altitude above sea level in meters that the geopotential altitude is measured from, e.g. the elevation of a launch site. Defaults to 0.
 
-    # Coefficients for the gravity formula for the Earth as an oblate spheroid
-    gamma_a = 9.780327  # m/s^2
-    c1 = 0.0052790414
-    c2 = 0.0000232718
-    c3 = 0.0000001262
-    c4 = 0.0000000007
+        Returns
+        -------
+        float or numpy.ndarray
+            Geopotential altitude above the reference altitude in meters.
+        """
+        return (self._potential(h) - self._potential(reference_altitude)) / self.gravity_at(reference_altitude)
 
-    gamma_0 = gamma_a * (1 + c1 * np.sin(phi)**2 + c2 * np.sin(phi)**4 + c3 * np.sin(phi)**6 + c4 * np.sin(phi)**8)
+    def _potential(self, h):
+        # Integral of gravity_at from sea level to h, per unit mass
+        return self.gamma_0 * h * (1 - self.free_air_linear / 2 * h + self.free_air_quadratic / 3 * h**2)
 
-    # Coefficients for the free air correction (the correction for the height above sea level)
-    k1 = 3.15704e-07  # 1/m
-    k2 = 2.10269e-09  # 1/m
-    k3 = 7.37452e-14  # 1/m^2
 
-    return gamma_0 * (1 - (k1 - k2 * np.sin(phi)**2) * h + k3 * h**2)
\ No newline at end of file
+# Opt-in call recording, see instrumentation.py
+instrumentation.register_module(__name__)
@@ -0,0 +1,360 @@
+import atexit
+import functools
+import json
+import marshal
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Set to 1 to print a summary when the program exits, or to a file path to write a report there (JSON if the path ends in .json, otherwise pstats)
+ENVIRONMENT_VARIABLE = "FEP_INSTRUMENT"
+
+# Functions that are instrumented, by module
+FUNCTIONS = {
+    "air_properties": ("temp_at_altitude", "pressure_at_altitude", "air_density_fn", "air_density_optimized", "lookup_dynamic_viscosity", "speed_of_sound", "saturation_vapor_pressure", "vapor_partial_pressure", "virtual_temperature", "moist_air_density", "moist_speed_of_sound"),
+    "gravity": ("get_local_gravity",),
+    "aerodynamic_properties": ("calculate_dynamic_pressure", "calculate_mach_number", "calculate_reynolds_number"),
+}
+
+# Methods that are instrumented, by module and class. Subclasses that override them are instrumented too.
+METHODS = {
+    ("gravity", "GravityField"): ("gravity_at", "geopotential_altitude"),
+    ("locations", "Location"): ("atmosphere_profile", "thermodynamic_state", "temperature_at", "altitude_at_pressure", "barometric_state", "geopotential_altitude", "tabulate"),
+}
+
+_REPO_DIR = Path(__file__).resolve().parent
+
+# The Instrumentation that is currently recording, if any
+_active = None
+
+# Names of the instrumented modules that have finished importing, see register_module
+_registered_modules = set()
+
+# Whether the environment variable has been checked, which happens once, when the first instrumented module is imported
+_environment_checked = False
+
+def _size_bucket(size):
+    # Upper bound of the power-of-two bucket of an array size: 1, 2, 4, 8, ...
+    return 1 << (size - 1).bit_length() if size > 1 else 1
+
+def _input_size(args):
+    # Size of the largest array argument, or None if every argument is a scalar
+    size = None
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            if arg.ndim > 0 and (size is None or arg.size > size):
+                size = arg.size
+        elif isinstance(arg, (list, tuple)) and (size is None or len(arg) > size):
+            size = len(arg)
+    return size
+
+def _function_key(function):
+    # (file, line, name), the way pstats identifies a function
+    code = function.__code__
+    return (code.co_filename, code.co_firstlineno, function.__qualname__)
+
+class CallRecord:
+    """
+    The statistics of the calls to one instrumented function.
+
+    Attributes
+    ----------
+    calls : int
+        Number of calls.
+    total_time : float
+        Wall time in seconds spent in the function, including the instrumented functions it called.
+    own_time : float
+        Wall time in seconds spent in the function, excluding the instrumented functions it called.
+    scalar_calls : int
+        Number of calls whose arguments were all scalars (including 0-d arrays).
+    array_calls : int
+        Number of calls with at least one array argument.
+    size_histogram : dict
+        Number of array calls by the size of the largest array argument, rounded up to a power of two.
+    callers : dict
+        [calls, own time, total time] of the calls made from each instrumented caller, keyed by the caller's pstats key.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.own_time = 0.0
+        self.scalar_calls = 0
+        self.array_calls = 0
+        self.size_histogram = {}
+        self.callers = {}
+
+    def as_dict(self):
+        """
+        Return the statistics as a JSON-serializable dict.
+        """
+        return {
+            "calls": self.calls,
+            "total_time": self.total_time,
+            "own_time": self.own_time,
+            "scalar_calls": self.scalar_calls,
+            "array_calls": self.array_calls,
+            "size_histogram": {str(bucket): count for bucket, count in sorted(self.size_histogram.items())},
+        }
+
+class Instrumentation:
+    """
+    Opt-in recording of the calls to the property functions in air_properties, gravity and aerodynamic_properties, and to the methods of Location and GravityField.
+
+    While enabled, the functions listed in FUNCTIONS and METHODS are replaced with wrappers that record call counts, wall time, the mix of scalar and array inputs, and a histogram of array sizes. Module-level names bound to those functions with "from module import function" are replaced too. Modules that are imported and subclasses that are defined while recording are instrumented as they appear. Disabling restores the original functions, so there is no cost at all when instrumentation is off.
+
+    Use it as a context manager:
+
+        with Instrumentation() as instrumentation:
+            run_simulation()
+        print(instrumentation.summary())
+
+    or set the FEP_INSTRUMENT environment variable to instrument a whole program, see enable_from_environment.
+
+    Attributes
+    ----------
+    records : dict
+        CallRecord of each instrumented function that was called, keyed by its pstats key (file, line, qualified name).
+    """
+    def __init__(self):
+        """
+        Initialize an Instrumentation object, which isn't recording until enabled.
+        """
+        self.records = {}
+        self._patches = []
+        self._originals = {}
+        self._stack = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+    @property
+    def enabled(self):
+        return _active is self
+
+    def enable(self):
+        """
+        Start recording by replacing the instrumented functions with wrappers. Only one Instrumentation can be enabled at a time.
+        """
+        global _active
+        if _active is not None:
+            raise RuntimeError("another Instrumentation is already enabled")
+        _active = self
+        for module_name in sorted(_registered_modules):
+            self._instrument_module(module_name)
+
+    def disable(self):
+        """
+        Stop recording and restore the original functions. The records are kept.
+        """
+        global _active
+        if _active is not self:
+            return
+        for target, name, original in reversed(self._patches):
+            if isinstance(target, dict):
+                target[name] = original
+            else:
+                setattr(target, name, original)
+        # Modules imported while recording may have bound the wrappers with "from module import function"
+        for namespace in _repo_namespaces():
+            for name, value in list(namespace.items()):
+                if callable(value) and value in self._originals:
+                    namespace[name] = self._originals[value]
+        self._patches = []
+        self._originals = {}
+        self._stack = []
+        _active = None
+
+    def _instrument_module(self, module_name):
+        module = sys.modules[module_name]
+        wrappers = {}
+        for name in FUNCTIONS.get(module_name, ()):
+            function = getattr(module, name)
+            wrappers[function] = self._wrap(function)
+            self._originals[wrappers[function]] = function
+
+        # Every module of this repository that has imported one of the functions gets the wrapper in its place
+        if wrappers:
+            for namespace in _repo_namespaces():
+                for name, value in list(namespace.items()):
+                    if callable(value) and value in wrappers:
+                        self._patches.append((namespace, name, value))
+                        namespace[name] = wrappers[value]
+
+        for (class_module, class_name), names in METHODS.items():
+            if class_module != module_name:
+                continue
+            classes = [getattr(module, class_name)]
+            while classes:
+                cls = classes.pop()
+                classes.extend(cls.__subclasses__())
+                self._instrument_class(cls, names)
+
+    def _instrument_class(self, cls, names):
+        for name in names:
+            if name in vars(cls):
+                method = vars(cls)[name]
+                self._patches.append((cls, name, method))
+                setattr(cls, name, self._wrap(method, method=True))
+
+    def reset(self):
+        """
+        Discard the records.
+        """
+        self.records = {}
+
+    def _wrap(self, function, method=False):
+        key = _function_key(function)
+        stack = self._stack
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            record = self.records.get(key)
+            if record is None:
+                record = self.records[key] = CallRecord()
+            size = _input_size(args[1:] if method else args)
+            if size is None:
+                size = _input_size(kwargs.values())
+
+            # Each frame on the stack is [key, time spent in instrumented functions it called]
+            caller = stack[-1][0] if stack else None
+            frame = [key, 0.0]
+            stack.append(frame)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                stack.pop()
+                if stack:
+                    stack[-1][1] += elapsed
+                own_time = elapsed - frame[1]
+
+                record.calls += 1
+                record.total_time += elapsed
+                record.own_time += own_time
+                if size is None:
+                    record.scalar_calls += 1
+                else:
+                    record.array_calls += 1
+                    bucket = _size_bucket(size)
+                    record.size_histogram[bucket] = record.size_histogram.get(bucket, 0) + 1
+                if caller is not None:
+                    caller_stats = record.callers.setdefault(caller, [0, 0.0, 0.0])
+                    caller_stats[0] += 1
+                    caller_stats[1] += own_time
+                    caller_stats[2] += elapsed
+
+        return wrapper
+
+    def report(self):
+        """
+        Return the records as a JSON-serializable dict, keyed by "module:qualified name" and sorted by total time.
+        """
+        report = {}
+        for key, record in sorted(self.records.items(), key=lambda item: -item[1].total_time):
+            report[f"{Path(key[0]).stem}:{key[2]}"] = record.as_dict()
+        return report
+
+    def export_json(self, path):
+        """
+        Write the report to a JSON file.
+        """
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def pstats_dict(self):
+        """
+        Return the records in the format of pstats.Stats.stats: {(file, line, name): (primitive calls, calls, own time, total time, callers)}.
+        """
+        return {
+            key: (record.calls, record.calls, record.own_time, record.total_time, {caller: (stats[0], stats[0], stats[1], stats[2]) for caller, stats in record.callers.items()})
+            for key, record in self.records.items()
+        }
+
+    def export_pstats(self, path):
+        """
+        Write the records to a file that pstats.Stats (and tools built on it, e.g. snakeviz) can load.
+
+        Recursive calls are counted as primitive calls, so their total time is counted more than once.
+        """
+        with open(path, "wb") as file:
+            marshal.dump(self.pstats_dict(), file)
+
+    def summary(self):
+        """
+        Return a table of the records, sorted by total time.
+        """
+        lines = [f"{'function':<45}{'calls':>10}{'total s':>12}{'own s':>12}{'scalar':>10}{'array':>10}  array sizes"]
+        for name, record in self.report().items():
+            sizes = ", ".join(f"<={bucket}: {count}" for bucket, count in record["size_histogram"].items())
+            lines.append(f"{name:<45}{record['calls']:>10}{record['total_time']:>12.6f}{record['own_time']:>12.6f}{record['scalar_calls']:>10}{record['array_calls']:>10}  {sizes}")
+        return "\n".join(lines)
+
+def _write_report(instrumentation, destination):
+    instrumentation.disable()
+    if destination.lower() in ("1", "true", "yes"):
+        print(instrumentation.summary(), file=sys.stderr)
+    elif destination.lower().endswith(".json"):
+        instrumentation.export_json(destination)
+    else:
+        instrumentation.export_pstats(destination)
+
+def _repo_namespaces():
+    # Namespaces of the modules of this repository that have been imported, including partially imported ones
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, "__file__", None)
+        if module_file is not None and Path(module_file).resolve().parent == _REPO_DIR:
+            yield vars(module)
+
+def register_module(module_name):
+    """
+    Record that an instrumented module has finished importing, and instrument it if an Instrumentation is recording. Called at the end of each module in FUNCTIONS and METHODS.
+
+    The first call also checks the FEP_INSTRUMENT environment variable (see enable_from_environment), so a program is instrumented from whichever of those modules it imports first.
+    """
+    _registered_modules.add(module_name)
+    if _active is not None:
+        _active._instrument_module(module_name)
+    elif not _environment_checked:
+        enable_from_environment()
+
+def register_subclass(cls):
+    """
+    Instrument a subclass of a class in METHODS that was defined while an Instrumentation is recording. Called from __init_subclass__ of those classes; subclasses defined before recording starts are found when it starts.
+    """
+    if _active is None:
+        return
+    for (module_name, class_name), names in METHODS.items():
+        if any(base.__module__ == module_name and base.__name__ == class_name for base in cls.__mro__[1:]):
+            _active._instrument_class(cls, names)
+
+def enable_from_environment():
+    """
+    Enable instrumentation for the rest of the program if the FEP_INSTRUMENT environment variable is set, and write the report when the program exits.
+
+    FEP_INSTRUMENT=1 prints a summary to stderr, FEP_INSTRUMENT=report.json writes the JSON report, and any other path gets a pstats file (e.g. FEP_INSTRUMENT=calls.prof, then python -m pstats calls.prof). Called by register_module when the first instrumented module is imported, and only acts once.
+
+    Returns
+    -------
+    Instrumentation or None
+        The enabled Instrumentation, or None if the environment variable isn't set or it was already checked.
+    """
+    global _environment_checked
+    if _environment_checked:
+        return None
+    _environment_checked = True
+    destination = os.environ.get(ENVIRONMENT_VARIABLE, "")
+    if destination.lower() in ("", "0", "false", "no") or _active is not None:
+        return None
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    atexit.register(_write_report, instrumentation, destination)
+    return instrumentation
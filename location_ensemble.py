@@ -0,0 +1,184 @@
+import numpy as np
+
+import constants as con
+import air_properties as ap
+from gravity import get_local_gravity
+from locations import Location
+
+class LocationEnsemble:
+    """
+    A collection of N sets of launch conditions, stored as NumPy columns, for Monte Carlo and dispersion studies.
+
+    Each member is equivalent to a Location object, but the derived constants for every member are calculated at once, and properties are evaluated for all members and altitudes in one broadcast calculation.
+
+    Attributes
+    ----------
+    ground_temperature : numpy.ndarray
+        The temperature at ground level of each member in Kelvin.
+    ground_pressure : numpy.ndarray
+        The pressure at ground level of each member in Pascals.
+    local_T_lapse_rate : numpy.ndarray
+        The temperature lapse rate of each member in Kelvin per meter.
+    elevation : numpy.ndarray
+        The elevation of each member in meters above sea level.
+    latitude : numpy.ndarray
+        The latitude of each member in degrees.
+    relative_humidity : numpy.ndarray
+        The relative humidity of each member as a fraction (0 to 1).
+
+    local_gravity : numpy.ndarray
+        The local gravity of each member in m/s^2.
+
+    density_multiplier : numpy.ndarray
+        The density_multiplier (see Location) of each member.
+    density_exponent : numpy.ndarray
+        The density_exponent (see Location) of each member.
+    """
+    def __init__(self, ground_temperature, ground_pressure, local_T_lapse_rate=con.T_lapse_rate, elevation=0, latitude=40, relative_humidity=0):
+        """
+        Initialize a LocationEnsemble object.
+
+        Parameters
+        ----------
+        ground_temperature : array_like
+            The temperature at ground level of each member in degrees Celsius.
+        ground_pressure : array_like
+            The pressure at ground level of each member in Pascals.
+        local_T_lapse_rate : array_like, optional
+            The temperature lapse rate of each member in Kelvin (or Celsius) per meter. The default is -0.0065.
+        elevation : array_like, optional
+            The elevation of each member in meters above sea level. The default is 0.
+        latitude : array_like, optional
+            The latitude of each member in degrees. The default is 40.
+        relative_humidity : array_like, optional
+            The relative humidity of each member as a fraction (0 to 1), see Location. The default is 0 (dry air).
+
+        Notes
+        -----
+        All parameters are broadcast against each other, so values shared by every member (e.g. the elevation and latitude of a launch site) can be given as scalars.
+        """
+        columns = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (ground_temperature, ground_pressure, local_T_lapse_rate, elevation, latitude, relative_humidity)))
+        if columns[0].ndim != 1:
+            raise ValueError("LocationEnsemble parameters must be scalars or 1-D arrays, with at least one 1-D array")
+
+        self.ground_temperature = columns[0] + 273.15
+        self.ground_pressure = columns[1].copy()
+        self.local_T_lapse_rate = columns[2].copy()
+        self.elevation = columns[3].copy()
+        self.latitude = columns[4].copy()
+        self.relative_humidity = columns[5].copy()
+        self._vapor_pressure_multiplier = self.relative_humidity * con.saturation_vapor_pressure_coefficients[0]
+
+        self.local_gravity = get_local_gravity(self.latitude, self.elevation)
+
+        self.density_multiplier = self.ground_pressure / (con.R_specific_air * np.power(self.ground_temperature, - self.local_gravity / (con.R_specific_air * self.local_T_lapse_rate)))
+        self.density_exponent = - self.local_gravity / (con.R_specific_air * self.local_T_lapse_rate) - 1
+
+    @classmethod
+    def sample(cls, n, ground_temperature, ground_pressure, local_T_lapse_rate=con.T_lapse_rate, elevation=0, latitude=40, relative_humidity=0, seed=None):
+        """
+        Create an ensemble of n members with launch conditions drawn uniformly at random.
+
+        Parameters
+        ----------
+        n : int
+            Number of members.
+        ground_temperature, ground_pressure, local_T_lapse_rate, elevation, latitude, relative_humidity
+            Either a fixed value shared by every member, or a (low, high) tuple to draw each member's value uniformly from. Units are the same as for LocationEnsemble.
+        seed : int or numpy.random.Generator, optional
+            Seed or generator for the random draws, for reproducible ensembles.
+
+        Returns
+        -------
+        LocationEnsemble
+            The sampled ensemble.
+
+        Examples
+        --------
+        Spaceport America Cup launch-day temperatures, with the other conditions of location_SAC:
+
+        >>> ensemble = LocationEnsemble.sample(10000, ground_temperature=(25, 45), ground_pressure=86400, local_T_lapse_rate=-0.00817, elevation=1401, latitude=32.99)
+        """
+        rng = np.random.default_rng(seed)
+
+        def draw(value):
+            if isinstance(value, tuple):
+                return rng.uniform(value[0], value[1], n)
+            return np.full(n, value, dtype=float)
+
+        return cls(draw(ground_temperature), draw(ground_pressure), draw(local_T_lapse_rate), draw(elevation), draw(latitude), draw(relative_humidity))
+
+    @classmethod
+    def from_locations(cls, locations):
+        """
+        Create an ensemble from a sequence of Location objects.
+        """
+        return cls(
+            [location.ground_temperature - 273.15 for location in locations],
+            [location.ground_pressure for location in locations],
+            [location.local_T_lapse_rate for location in locations],
+            [location.elevation for location in locations],
+            [location.latitude for location in locations],
+            [location.relative_humidity for location in locations],
+        )
+
+    def __len__(self):
+        return len(self.ground_temperature)
+
+    def __getitem__(self, i):
+        """
+        Return member i as a Location object.
+        """
+        return Location(self.ground_temperature[i] - 273.15, self.ground_pressure[i], self.local_T_lapse_rate[i], self.elevation[i], self.latitude[i], self.relative_humidity[i])
+
+    def atmosphere_profile(self, altitudes, out=None):
+        """
+        Calculate all atmospheric properties for every member at every altitude.
+
+        Parameters
+        ----------
+        altitudes : array_like
+            1-D array of M altitudes above ground level in meters, shared by every member.
+        out : dict, optional
+            Preallocated float64 arrays of shape (N, M) to write the results into, keyed like the returned dict. Any subset of the keys can be given.
+
+        Returns
+        -------
+        dict
+            Arrays of shape (N members, M altitudes), with the same keys and units as Location.atmosphere_profile.
+        """
+        h = np.asarray(altitudes, dtype=float)
+        shape = (len(self), h.size)
+        h = h.reshape(1, -1)
+        out = {} if out is None else out
+        results = {key: out[key] if key in out else np.empty(shape) for key in ("temperature", "pressure", "density", "speed_of_sound", "dynamic_viscosity", "gravity")}
+
+        temperature = results["temperature"]
+        np.multiply(h, self.local_T_lapse_rate[:, np.newaxis], out=temperature)
+        temperature += self.ground_temperature[:, np.newaxis]
+
+        density = results["density"]
+        np.power(temperature, self.density_exponent[:, np.newaxis], out=density)
+        density *= self.density_multiplier[:, np.newaxis]
+
+        pressure = results["pressure"]
+        np.multiply(density, temperature, out=pressure)
+        pressure *= con.R_specific_air
+
+        speed_of_sound = results["speed_of_sound"]
+        np.multiply(temperature, con.adiabatic_index_air_times_R_specific_air, out=speed_of_sound)
+        np.sqrt(speed_of_sound, out=speed_of_sound)
+
+        # Only humid members pay for the humidity calculations, and dry members keep the dry-air results
+        humid = np.flatnonzero(self.relative_humidity)
+        if humid.size:
+            humid_temperature = temperature[humid]
+            humid_pressure = pressure[humid]
+            vapor_pressure = ap._magnus_formula(self._vapor_pressure_multiplier[humid, np.newaxis], humid_temperature)
+            density[humid] = ap.moist_air_density(humid_pressure, humid_temperature, vapor_pressure)
+            speed_of_sound[humid] = ap.moist_speed_of_sound(humid_temperature, humid_pressure, vapor_pressure)
+
+        results["dynamic_viscosity"][...] = ap.lookup_dynamic_viscosity(temperature)
+        results["gravity"][...] = get_local_gravity(self.latitude[:, np.newaxis], self.elevation[:, np.newaxis] + h)
+
+        return results
@@ -1,5 +1,16 @@
+import numpy as np
+
 import constants as con
-from gravity import get_local_gravity
+import air_properties as ap
+from aerodynamic_properties import calculate_mach_number
+from atmosphere_cursor import AtmosphereCursor
+from atmosphere_table import AtmosphereTable
+from site_registry import DEFAULT_SITES_FILE, SiteRegistry
+from gravity import GravityField
+import instrumentation
+
+# Number of altitudes processed at a time by Location.atmosphere_jacobian, small enough for the temporaries to stay in the CPU cache
+_JACOBIAN_BLOCK_SIZE = 1 << 13
 
 class Location:
     """
@@ -17,7 +28,11 @@ class Location:
         The elevation of the location in meters above sea level.
     latitude : float
         The latitude of the location in degrees.
+    relative_humidity : float
+        The relative humidity as a fraction (0 to 1), taken as constant with altitude. 0 for dry air.
 
+    gravity_field : GravityField
+        The gravity field at the latitude of the location.
     local_gravity : float
         The local gravity at the location in m/s^2.
 
@@ -25,8 +40,32 @@ class Location:
         A constant derived from the temperature and pressure at the launchpad, the lapse rate, the specific gas constant for air, and the magnitude of the force of gravity. Used in the air_density_optimized function. Equal to ground_pressure / (R_specific_air * pow(ground_temperature, - local_gravity / (R_specific_air * T_lapse_rate))).
     density_exponent : float
         A constant derived from the lapse rate, the specific gas constant for air, and the magnitude of the force of gravity. Used in the air_density_optimized function. Equal to - local_gravity / (R_specific_air * T_lapse_rate) - 1.
+
+    layer_base_altitudes : numpy.ndarray
+        Altitudes above ground level in meters of the bases of the layers of the layered atmosphere model. The first layer starts at the ground and uses local_T_lapse_rate up to the tropopause, and the layers above it follow the U.S. Standard Atmosphere 1976.
+    layer_lapse_rates : numpy.ndarray
+        Temperature lapse rate of each layer in Kelvin per meter.
+    layer_base_temperatures : numpy.ndarray
+        Temperature at the base of each layer in Kelvin.
+    layer_base_pressures : numpy.ndarray
+        Pressure at the base of each layer in Pascals.
+    layer_pressure_exponents : numpy.ndarray
+        Exponent of the temperature ratio in the pressure of each gradient layer, equal to - local_gravity / (R_specific_air * lapse rate). Zero for isothermal layers.
+    layer_pressure_decay_rates : numpy.ndarray
+        Rate of the exponential decay of pressure with altitude in each isothermal layer in 1/m, equal to local_gravity / (R_specific_air * base temperature). Zero for gradient layers.
+
+    table : AtmosphereTable or None
+        Interpolation table built by the tabulate method, or None if tabulated mode hasn't been enabled.
     """
-    def __init__(self, ground_temperature, ground_pressure, local_T_lapse_rate=con.T_lapse_rate, elevation=0, latitude=40):
+    # Variables of the derivatives returned by atmosphere_jacobian, in the order of the first axis of the Jacobians
+    JACOBIAN_VARIABLES = ("altitude", "ground_temperature", "ground_pressure", "lapse_rate")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses defined while instrumentation is recording are instrumented too, see instrumentation.py
+        instrumentation.register_subclass(cls)
+
+    def __init__(self, ground_temperature, ground_pressure, local_T_lapse_rate=con.T_lapse_rate, elevation=0, latitude=40, relative_humidity=0):
         """
         Initialize a Location object.
 
@@ -42,6 +81,8 @@ class Location:
             The elevation of the location in meters above sea level. The default is 0.
         latitude : float, optional
             The latitude of the location in degrees. The default is 40.
+        relative_humidity : float, optional
+            The relative humidity as a fraction (0 to 1), taken as constant with altitude. Humidity lowers the density and raises the speed of sound slightly; pressure still follows the dry-air model from the measured ground pressure. The default is 0 (dry air), which skips every humidity calculation.
 
         Notes
         -----
@@ -52,14 +93,430 @@ class Location:
         self.local_T_lapse_rate = local_T_lapse_rate
         self.elevation = elevation
         self.latitude = latitude
+        self.relative_humidity = relative_humidity
+        # Vapor pressure is relative_humidity * a * exp(b * T_C / (T_C + c)), see air_properties.saturation_vapor_pressure
+        self._vapor_pressure_multiplier = relative_humidity * con.saturation_vapor_pressure_coefficients[0]
+
+        self.gravity_field = GravityField(latitude)
+        self.local_gravity = self.gravity_field.gravity_at(elevation)
+
+        self._init_density_constants()
+        self._init_layers()
+
+        self.table = None
+
+    def _init_density_constants(self):
+        self.density_multiplier = self.ground_pressure / (con.R_specific_air * pow(self.ground_temperature, - self.local_gravity / (con.R_specific_air * self.local_T_lapse_rate)))
+        self.density_exponent = - self.local_gravity / (con.R_specific_air * self.local_T_lapse_rate) - 1
+
+    def _init_layers(self):
+        # Layers of the standard atmosphere above the tropopause, moved to altitudes above this location's ground level
+        base_altitudes = [0.0]
+        lapse_rates = [self.local_T_lapse_rate]
+        for base_altitude, lapse_rate in zip(con.US_standard_atmosphere_layer_base_altitudes[1:], con.US_standard_atmosphere_layer_lapse_rates[1:]):
+            if base_altitude > self.elevation:
+                base_altitudes.append(base_altitude - self.elevation)
+                lapse_rates.append(lapse_rate)
+
+        base_temperatures = [self.ground_temperature]
+        base_pressures = [self.ground_pressure]
+        pressure_exponents = []
+        pressure_decay_rates = []
+        for i, lapse_rate in enumerate(lapse_rates):
+            if lapse_rate == 0:
+                pressure_exponents.append(0.0)
+                pressure_decay_rates.append(self.local_gravity / (con.R_specific_air * base_temperatures[i]))
+            else:
+                pressure_exponents.append(- self.local_gravity / (con.R_specific_air * lapse_rate))
+                pressure_decay_rates.append(0.0)
+
+            if i + 1 < len(lapse_rates):
+                thickness = base_altitudes[i + 1] - base_altitudes[i]
+                top_temperature = base_temperatures[i] + lapse_rate * thickness
+                base_temperatures.append(top_temperature)
+                base_pressures.append(base_pressures[i] * pow(top_temperature / base_temperatures[i], pressure_exponents[i]) * np.exp(- pressure_decay_rates[i] * thickness))
+
+        self.layer_base_altitudes = np.array(base_altitudes)
+        self.layer_lapse_rates = np.array(lapse_rates)
+        self.layer_base_temperatures = np.array(base_temperatures)
+        self.layer_base_pressures = np.array(base_pressures)
+        self.layer_pressure_exponents = np.array(pressure_exponents)
+        self.layer_pressure_decay_rates = np.array(pressure_decay_rates)
+
+    def atmosphere_profile(self, altitudes, out=None, layered=False, geopotential=False):
+        """
+        Calculate all atmospheric properties at an array of altitudes in a single pass.
+
+        Parameters
+        ----------
+        altitudes : array_like
+            Altitudes above ground level in meters.
+        out : dict, optional
+            Preallocated float64 arrays to write the results into, keyed like the returned dict. Any subset of the keys can be given; missing arrays are allocated. Each array must have the same shape as altitudes.
+        layered : bool, optional
+            If True, use the layered atmosphere model, which is valid above the tropopause (see layer_base_altitudes). If False, use a single layer with local_T_lapse_rate, which is only valid in the troposphere. The default is False.
+        geopotential : bool, optional
+            If True, account for gravity decreasing with altitude by converting the altitudes to geopotential altitudes (see geopotential_altitude) before calculating temperature, pressure and density. If False, gravity is held constant at local_gravity for those properties. The default is False.
+
+        Returns
+        -------
+        dict
+            Arrays with the same shape as altitudes:
+                - 'temperature': temperature in Kelvin
+                - 'pressure': pressure in Pascals
+                - 'density': air density in kg/m^3
+                - 'speed_of_sound': speed of sound in m/s
+                - 'dynamic_viscosity': dynamic viscosity in kg/(m*s)
+                - 'gravity': local gravity in m/s^2
+
+        Notes
+        -----
+        The temperature is computed once and reused for every other property. Density uses density_multiplier and density_exponent (as in air_density_optimized), and pressure is derived from that density with the ideal gas law, so the two are always consistent with each other. Gravity is evaluated at the altitude above sea level (elevation + altitude).
+        """
+        h = np.asarray(altitudes, dtype=float)
+        out = {} if out is None else out
+        results = {key: out[key] if key in out else np.empty(h.shape) for key in ("temperature", "pressure", "density", "speed_of_sound", "dynamic_viscosity", "gravity")}
+
+        temperature = results["temperature"]
+        speed_of_sound = results["speed_of_sound"]
+        # In humid air, the speed of sound array holds the vapor pressure until the speed of sound is calculated from it
+        self.thermodynamic_state(h, temperature, results["pressure"], results["density"], layered, geopotential, vapor_pressure=speed_of_sound if self.relative_humidity else None)
+
+        if self.relative_humidity:
+            speed_of_sound[...] = ap.moist_speed_of_sound(temperature, results["pressure"], speed_of_sound)
+        else:
+            np.multiply(temperature, con.adiabatic_index_air_times_R_specific_air, out=speed_of_sound)
+            np.sqrt(speed_of_sound, out=speed_of_sound)
+
+        results["dynamic_viscosity"][...] = ap.lookup_dynamic_viscosity(temperature)
+        results["gravity"][...] = self.gravity_field.gravity_at(self.elevation + h)
+
+        return results
+
+    def thermodynamic_state(self, altitudes, temperature, pressure, density, layered=False, geopotential=False, vapor_pressure=None):
+        """
+        Calculate temperature, pressure and density at an array of altitudes, writing them into preallocated arrays without allocating any temporary arrays (in the troposphere model). This is the core of atmosphere_profile, for code that manages its own buffers.
+
+        Parameters
+        ----------
+        altitudes : numpy.ndarray
+            Altitudes above ground level in meters.
+        temperature, pressure, density : numpy.ndarray
+            float64 arrays with the same shape as altitudes that the temperature (K), pressure (Pa) and density (kg/m^3) are written into.
+        layered : bool, optional
+            If True, use the layered atmosphere model. The default is False.
+        geopotential : bool, optional
+            If True, convert the altitudes to geopotential altitudes first. The default is False.
+        vapor_pressure : numpy.ndarray, optional
+            float64 array with the same shape as altitudes that the partial pressure of water vapor (Pa) is written into, so that it can be reused, e.g. for the speed of sound. Left untouched for dry air (relative_humidity of 0). The default is None.
+        """
+        if geopotential:
+            altitudes = self.geopotential_altitude(altitudes)
+        if layered:
+            self._layered_state(altitudes, temperature, pressure, density)
+        else:
+            np.multiply(altitudes, self.local_T_lapse_rate, out=temperature)
+            temperature += self.ground_temperature
+
+            np.power(temperature, self.density_exponent, out=density)
+            density *= self.density_multiplier
+
+            np.multiply(density, temperature, out=pressure)
+            pressure *= con.R_specific_air
+
+        if self.relative_humidity:
+            self._moist_density(temperature, pressure, density, vapor_pressure)
+
+    def _moist_density(self, temperature, pressure, density, vapor_pressure=None):
+        # Write the density of moist air into density, and the vapor pressure into vapor_pressure if it is given
+        if vapor_pressure is None:
+            vapor_pressure = self.vapor_pressure(temperature)
+        else:
+            vapor_pressure[...] = self.vapor_pressure(temperature)
+        density[...] = ap.moist_air_density(pressure, temperature, vapor_pressure)
+
+    def vapor_pressure(self, temperature):
+        """
+        Calculate the partial pressure of water vapor at the location's relative humidity.
+
+        Parameters
+        ----------
+        temperature : float or array_like
+            Temperature in Kelvin.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Vapor partial pressure in Pascals. Same as air_properties.vapor_partial_pressure, with relative_humidity * a of the Magnus formula precomputed.
+        """
+        return ap._magnus_formula(self._vapor_pressure_multiplier, temperature)
+
+    def atmosphere_jacobian(self, altitudes, out=None):
+        """
+        Calculate temperature, pressure, density and speed of sound at an array of altitudes together with their derivatives with respect to the altitude and the parameters of the location, in a single pass.
+
+        The derivatives are closed-form, so they are exact and free of the noise and extra calls of finite differences. They are products of the values, 1/T and constants derived from density_exponent, so the only transcendental function beyond those of the values is one log1p for the lapse rate derivatives. Uses the troposphere model with constant gravity (the default of atmosphere_profile), and is only available for dry air (relative_humidity of 0).
 
-        self.local_gravity = get_local_gravity(latitude, elevation)
+        Parameters
+        ----------
+        altitudes : array_like
+            Altitudes above ground level in meters.
+        out : tuple of dict, optional
+            The (values, jacobians) returned by a previous call with altitudes of the same shape, whose arrays are overwritten instead of allocating new ones. Writing into fresh arrays costs more than the arithmetic of the derivatives, so reusing them matters when calling this repeatedly, e.g. in an optimizer loop.
+
+        Returns
+        -------
+        values : dict
+            Arrays with the same shape as altitudes:
+                - 'temperature': temperature in Kelvin
+                - 'pressure': pressure in Pascals
+                - 'density': air density in kg/m^3
+                - 'speed_of_sound': speed of sound in m/s
+        jacobians : dict
+            Arrays with a first axis of length 4 followed by the shape of altitudes, keyed like values. Along the first axis are the derivatives with respect to the variables in JACOBIAN_VARIABLES, in that order, so that each derivative is a contiguous array:
+                - 'altitude': per meter
+                - 'ground_temperature': per Kelvin (or degree Celsius)
+                - 'ground_pressure': per Pascal
+                - 'lapse_rate': per (Kelvin per meter), with local_gravity held constant
+        """
+        if self.relative_humidity:
+            raise ValueError("atmosphere_jacobian is only available for dry air, set relative_humidity to 0")
+        h = np.asarray(altitudes, dtype=float)
+        keys = ("temperature", "pressure", "density", "speed_of_sound")
+        if out is None:
+            values = {key: np.empty(h.shape) for key in keys}
+            jacobians = {key: np.empty((4,) + h.shape) for key in keys}
+        else:
+            values, jacobians = out
+
+        # Work through 1-D arrays in blocks, so that the temporaries are small and reused from block to block
+        if h.ndim == 1:
+            blocks = [slice(start, start + _JACOBIAN_BLOCK_SIZE) for start in range(0, h.size, _JACOBIAN_BLOCK_SIZE)]
+        else:
+            blocks = [...]
+        for block in blocks:
+            self._jacobian_block(h[block], *(values[key][block] for key in keys), *(jacobians[key][:, block] for key in keys))
+
+        return values, jacobians
+
+    def _jacobian_block(self, h, temperature, pressure, density, speed_of_sound, d_temperature, d_pressure, d_density, d_speed_of_sound):
+        self.thermodynamic_state(h, temperature, pressure, density)
+        np.multiply(temperature, con.adiabatic_index_air_times_R_specific_air, out=speed_of_sound)
+        np.sqrt(speed_of_sound, out=speed_of_sound)
+
+        # Pressure is ground_pressure * (T / ground_temperature)^n and density is pressure / (R T), with T = ground_temperature + lapse_rate * h and n = density_exponent + 1 = - local_gravity / (R lapse_rate)
+        lapse_rate = self.local_T_lapse_rate
+        n = self.density_exponent + 1
+        inverse_temperature = 1 / temperature
+        # ln(T / ground_temperature), which is how n enters the values, so the lapse rate derivatives get a term from dn/dL = -n/L
+        log_temperature_ratio = np.log1p(np.multiply(h, lapse_rate / self.ground_temperature))
+
+        d_temperature[0, ...] = lapse_rate
+        d_temperature[1, ...] = 1.0
+        d_temperature[2, ...] = 0.0
+        d_temperature[3, ...] = h
+
+        # dp/dh = -g rho (hydrostatic balance), and p n / T = n R rho
+        np.multiply(density, - self.local_gravity, out=d_pressure[0, ...])
+        np.multiply(pressure, - n / self.ground_temperature, out=d_pressure[1, ...])
+        d_pressure[1, ...] += (n * con.R_specific_air) * density
+        np.multiply(pressure, 1 / self.ground_pressure, out=d_pressure[2, ...])
+        np.multiply(density, h, out=d_pressure[3, ...])
+        d_pressure[3, ...] *= n * con.R_specific_air
+        d_pressure[3, ...] -= (n / lapse_rate) * pressure * log_temperature_ratio
+
+        # d ln(rho) = d ln(p) - d ln(T), and n - 1 = density_exponent
+        density_over_temperature = density * inverse_temperature
+        np.multiply(density_over_temperature, self.density_exponent * lapse_rate, out=d_density[0, ...])
+        np.multiply(density, - n / self.ground_temperature, out=d_density[1, ...])
+        d_density[1, ...] += self.density_exponent * density_over_temperature
+        np.multiply(density, 1 / self.ground_pressure, out=d_density[2, ...])
+        np.multiply(density_over_temperature, h, out=d_density[3, ...])
+        d_density[3, ...] *= self.density_exponent
+        d_density[3, ...] -= (n / lapse_rate) * density * log_temperature_ratio
+
+        # d ln(a) = d ln(T) / 2
+        half_speed_of_sound_over_temperature = speed_of_sound * inverse_temperature
+        half_speed_of_sound_over_temperature *= 0.5
+        np.multiply(half_speed_of_sound_over_temperature, lapse_rate, out=d_speed_of_sound[0, ...])
+        d_speed_of_sound[1, ...] = half_speed_of_sound_over_temperature
+        d_speed_of_sound[2, ...] = 0.0
+        np.multiply(half_speed_of_sound_over_temperature, h, out=d_speed_of_sound[3, ...])
+
+    def altitude_at_pressure(self, pressures, layered=False):
+        """
+        Calculate the altitude above ground level at which the atmosphere has a given pressure. This is the inverse of the pressure returned by atmosphere_profile, e.g. for reconstructing altitude from logged barometric pressure.
 
-        self.density_multiplier = ground_pressure / (con.R_specific_air * pow(self.ground_temperature, - self.local_gravity / (con.R_specific_air * local_T_lapse_rate)))
-        self.density_exponent = - self.local_gravity / (con.R_specific_air * local_T_lapse_rate) - 1
+        Parameters
+        ----------
+        pressures : float or array_like
+            Pressures in Pascals.
+        layered : bool, optional
+            If True, invert the layered atmosphere model instead of the troposphere model. The default is False.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Altitudes above ground level in meters.
+        """
+        p = np.asarray(pressures, dtype=float)
+        if not layered:
+            return self.ground_temperature * (np.power(p / self.ground_pressure, 1 / (self.density_exponent + 1)) - 1) / self.local_T_lapse_rate
+
+        # Base pressures decrease with altitude, so search on their negatives to get an ascending array
+        layer = np.maximum(np.searchsorted(- self.layer_base_pressures, - p, side="right") - 1, 0)
+        isothermal = self.layer_lapse_rates == 0
+        # Placeholder values avoid dividing by zero in the branch that isn't used for each layer
+        lapse_rates = np.where(isothermal, 1.0, self.layer_lapse_rates)
+        pressure_exponents = np.where(isothermal, 1.0, self.layer_pressure_exponents)
+        decay_rates = np.where(isothermal, self.layer_pressure_decay_rates, 1.0)
+
+        log_pressure_ratio = np.log(p / self.layer_base_pressures[layer])
+        gradient_height = self.layer_base_temperatures[layer] * np.expm1(log_pressure_ratio / pressure_exponents[layer]) / lapse_rates[layer]
+        isothermal_height = - log_pressure_ratio / decay_rates[layer]
+        return self.layer_base_altitudes[layer] + np.where(isothermal[layer], isothermal_height, gradient_height)
+
+    def temperature_at(self, altitudes, layered=False):
+        """
+        Calculate the temperature at altitudes above ground level.
+
+        Parameters
+        ----------
+        altitudes : float or array_like
+            Altitudes above ground level in meters.
+        layered : bool, optional
+            If True, use the layered atmosphere model. The default is False.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Temperatures in Kelvin.
+        """
+        if not layered:
+            return ap.temp_at_altitude(altitudes, self.ground_temperature, self.local_T_lapse_rate)
+        h = np.asarray(altitudes, dtype=float)
+        layer = np.maximum(np.searchsorted(self.layer_base_altitudes, h, side="right") - 1, 0)
+        return self.layer_base_temperatures[layer] + self.layer_lapse_rates[layer] * (h - self.layer_base_altitudes[layer])
+
+    def barometric_state(self, pressures, speeds=None, layered=False):
+        """
+        Reconstruct the flight state from measured barometric pressures, e.g. from a flight computer log.
+
+        Parameters
+        ----------
+        pressures : array_like
+            Measured pressures in Pascals.
+        speeds : array_like, optional
+            Measured airspeeds in m/s, used to calculate the Mach number.
+        layered : bool, optional
+            If True, use the layered atmosphere model. The default is False.
+
+        Returns
+        -------
+        dict
+            Arrays with the same shape as pressures:
+                - 'altitude': altitude above ground level in meters
+                - 'temperature': temperature in Kelvin
+                - 'density': air density in kg/m^3
+                - 'mach_number': Mach number (only if speeds is given)
+        """
+        p = np.asarray(pressures, dtype=float)
+        altitude = self.altitude_at_pressure(p, layered)
+        temperature = self.temperature_at(altitude, layered)
+
+        if self.relative_humidity:
+            vapor_pressure = self.vapor_pressure(temperature)
+            density = ap.moist_air_density(p, temperature, vapor_pressure)
+            speed_of_sound = ap.moist_speed_of_sound(temperature, p, vapor_pressure)
+        else:
+            density = ap.air_density_fn(p, temperature)
+            speed_of_sound = ap.speed_of_sound(temperature)
+
+        state = {
+            "altitude": altitude,
+            "temperature": temperature,
+            "density": density,
+        }
+        if speeds is not None:
+            state["mach_number"] = calculate_mach_number(np.asarray(speeds, dtype=float), speed_of_sound)
+        return state
+
+    def geopotential_altitude(self, altitudes):
+        """
+        Convert geometric altitudes above ground level to geopotential altitudes above ground level, relative to local_gravity.
+
+        Parameters
+        ----------
+        altitudes : float or array_like
+            Geometric altitudes above ground level in meters.
+
+        Returns
+        -------
+        float or numpy.ndarray
+            Geopotential altitudes above ground level in meters.
+        """
+        return self.gravity_field.geopotential_altitude(self.elevation + altitudes, self.elevation)
+
+    def _layered_state(self, h, temperature, pressure, density):
+        # Altitudes below ground level extend the first layer
+        layer = np.maximum(np.searchsorted(self.layer_base_altitudes, h, side="right") - 1, 0)
+        height_in_layer = h - self.layer_base_altitudes[layer]
+        base_temperature = self.layer_base_temperatures[layer]
+
+        temperature[...] = base_temperature + self.layer_lapse_rates[layer] * height_in_layer
+
+        # Gradient layers have a zero decay rate and isothermal layers have a zero exponent, so one expression covers both
+        pressure[...] = self.layer_base_pressures[layer] * np.power(temperature / base_temperature, self.layer_pressure_exponents[layer]) * np.exp(- self.layer_pressure_decay_rates[layer] * height_in_layer)
+
+        np.multiply(temperature, con.R_specific_air, out=density)
+        np.divide(pressure, density, out=density)
+
+    def cursor(self, tolerance=1e-9):
+        """
+        Create an AtmosphereCursor for fast repeated scalar queries from a time-stepping integrator. Only available for dry air (relative_humidity of 0).
+
+        Parameters
+        ----------
+        tolerance : float, optional
+            Largest allowed relative error of results that are updated from a nearby altitude rather than evaluated exactly. The default is 1e-9.
+
+        Returns
+        -------
+        AtmosphereCursor
+            A new cursor for this location.
+        """
+        if self.relative_humidity:
+            raise ValueError("AtmosphereCursor is only available for dry air, set relative_humidity to 0")
+        return AtmosphereCursor(self, tolerance)
+
+    def tabulate(self, resolution=10, ceiling=12000, kind="linear", layered=False):
+        """
+        Build an interpolation table of atmospheric properties for fast repeated queries, and store it as the table attribute.
+
+        Parameters
+        ----------
+        resolution : float, optional
+            Spacing of the altitude grid in meters. The default is 10.
+        ceiling : float, optional
+            Highest altitude above ground level to tabulate, in meters. The default is 12000.
+        kind : str, optional
+            Interpolation method, 'linear' or 'cubic'. The default is 'linear'.
+        layered : bool, optional
+            If True, tabulate the layered atmosphere model (see atmosphere_profile). The default is False.
+
+        Returns
+        -------
+        AtmosphereTable
+            The table. Its max_error and max_relative_error attributes give the worst-case interpolation error against the closed-form functions.
+        """
+        self.table = AtmosphereTable(self, resolution, ceiling, kind, layered)
+        return self.table
+
+# Launch sites, defined in launch_sites.json. Location objects are only built when a site is first used, e.g. launch_sites["SAC"].
+launch_sites = SiteRegistry.from_file(DEFAULT_SITES_FILE)
 
 # Location class configuration for Spaceport America Cup
-T_lapse_rate_SA = -0.00817 # K/m
+T_lapse_rate_SA = launch_sites.parameters("SAC")["local_T_lapse_rate"] # K/m
 """ How T_lapse_rate at Spaceport America was determined
 
 Only one source was found with the lapse rate for Spaceport America:
@@ -88,41 +545,39 @@ The following was the most comprehensive source found for temperature lapse rate
 - has values for many locations in New Mexico (search for n. mex), and they ranged from -1.4 to -3.9 K/km
     - the closest station to SA was Datil, which had a lapse rate of -3.1 K/km
 """
-launchpad_pressure_SAC = 86400 # Pa
+launchpad_pressure_SAC = launch_sites.parameters("SAC")["ground_pressure"] # Pa
 """ How the launchpad pressure at Spaceport America was determined
 
 - 86400 2022/06/24   WE Rocketry 2022 TeleMega/TeleMetrum data
 - 86405 2022/06/23   https://github.com/ISSUIUC/flight-data/tree/master/20220623
 - 86170 2023/06/21   https://github.com/ISSUIUC/flight-data/tree/master/20230621
 """
-launchpad_temp_SAC = 35 # deg C
+launchpad_temp_SAC = launch_sites.parameters("SAC")["ground_temperature"] # deg C
 """ Ground-level temperature at Spaceport America Cup note
 
 Flights can occur between about 07:00 and 16:30 local time, so the temperature at the time of launch can vary significantly. 35 C is about what it has been historically during the competition in mid-late June. Getting closer to launch day, it would be more accurate to use a weather forecast to get a value for expected temperature(s).
 
 You can also consider running simulations with a range of temperatures that have been seen on launch days in the past (normally between 25 and 45 C) to see how different ground-level temperatures could affect a rocket's flight.
 """
-latitude_SA = 32.99 # deg, Spaceport America's latitude
+latitude_SA = launch_sites.parameters("SAC")["latitude"] # deg, Spaceport America's latitude
 """ https://maps.app.goo.gl/rZT6MRLqHneA7wNX7 """
-altitude_SA = 1401 # m, Spaceport America's elevation
+altitude_SA = launch_sites.parameters("SAC")["elevation"] # m, Spaceport America's elevation
 """ https://www.spaceportamerica.com/faq/#toggle-id-15 """
 
-location_SAC = Location(ground_temperature=launchpad_temp_SAC, ground_pressure=launchpad_pressure_SAC, local_T_lapse_rate=T_lapse_rate_SA, elevation=altitude_SA, latitude=latitude_SA)
-
 # Location class configuration for Launch Canada
-T_lapse_rate_LC = con.T_lapse_rate
+T_lapse_rate_LC = launch_sites.parameters("LC").get("local_T_lapse_rate", con.T_lapse_rate)
 """ How T_lapse_rate at Launch Canada was determined
 
 From a really really rough analysis of the flight data here: https://github.com/UVicRocketry/Xenia1-MaGP-I/tree/main
 
 The temperature readings couldn't be used because it looks like the flight computer never got to the temperature of the outside (unless it only dropped 4 degrees on a 10k ft flight). However, looking at the pressure data, it looks similar to what it should look like given a lapse rate quite close to the standard -6.5 K/km. This is a very rough estimate, and it would be better to get a more accurate value from real temperature measurements at the launch site around late August.
 """
-launchpad_pressure_LC = 102000 # Pa
+launchpad_pressure_LC = launch_sites.parameters("LC")["ground_pressure"] # Pa
 """ Ground-level pressure at Launch Canada note
 
 I could not find historical weather data for the launch site itself. Camp Kenogaming is very close to the launch site (6km away) and at nearly the same elevation: https://www.timeanddate.com/weather/@5914408/historic?month=8&year=2024
 """
-launchpad_temp_LC = 20 # deg C
+launchpad_temp_LC = launch_sites.parameters("LC")["ground_temperature"] # deg C
 """ Ground-level temperature at Launch Canada note
 
 I could not find historical weather data for the launch site itself. Camp Kenogaming is very close to the launch site (6km away) and at nearly the same elevation: https://www.timeanddate.com/weather/@5914408/historic?month=8&year=2024
@@ -131,32 +586,47 @@ Flights can occur from fairly early in the morning to late in the afternoon, so
 
 You can also consider running simulations with a range of temperatures that have been seen on launch days in the past (normally between 15 and 30 C) to see how different ground-level temperatures could affect a rocket's flight.
 """
-latitude_LC = 47.987 # deg, Launch Canada's launch site latitude
+latitude_LC = launch_sites.parameters("LC")["latitude"] # deg, Launch Canada's launch site latitude
 """ https://maps.app.goo.gl/n76cD331j7LiQiTB6 """
-altitude_LC = 364 # m, Launch Canada's launch site elevation
+altitude_LC = launch_sites.parameters("LC")["elevation"] # m, Launch Canada's launch site elevation
 """ from Google Earth 
 https://earth.google.com/web/search/Launch+Canada+Launch+Pad/@47.9869503,-81.8485488,363.96383335a,679.10907018d,35y """
 
-location_LC = Location(ground_temperature=launchpad_temp_LC, ground_pressure=launchpad_pressure_LC, local_T_lapse_rate=T_lapse_rate_LC, elevation=altitude_LC, latitude=latitude_LC)
+# Module attributes that are built on first access, so importing this module doesn't construct any Location objects
+_lazy_locations = {"location_SAC": "SAC", "location_LC": "LC"}
+
+def __getattr__(name):
+    if name in _lazy_locations:
+        return launch_sites[_lazy_locations[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Opt-in call recording, see instrumentation.py
+instrumentation.register_module(__name__)
 
 if __name__ == "__main__":
-    import air_properties as ap
     import matplotlib.pyplot as plt
 
+    location_SAC = launch_sites["SAC"]
+    location_LC = launch_sites["LC"]
+
     # plot the following atmospheric properties at different altitudes at SAC and LC
-    altitudes = range(0, 10000, 100)
+    altitudes = np.arange(0, 10000, 100)
+
+    # Pressures come from atmosphere_profile (ideal gas law on the plotted density), so the pressure and density plots agree.
 
-    SAC_temps = [ap.temp_at_altitude(h, location_SAC.ground_temperature, location_SAC.local_T_lapse_rate) for h in altitudes]
-    SAC_pressures = [ap.pressure_at_altitude(h, location_SAC.ground_temperature, location_SAC.ground_pressure, location_SAC.local_T_lapse_rate, location_SAC.local_gravity) for h in altitudes]
-    SAC_densities = [ap.air_density_optimized(temp, location_SAC.density_multiplier, location_SAC.density_exponent) for temp in SAC_temps]
-    SAC_speeds_of_sound = [ap.speed_of_sound(temp) for temp in SAC_temps]
-    SAC_gravities = [get_local_gravity(location_SAC.latitude, altitude) for altitude in altitudes]
+    SAC_profile = location_SAC.atmosphere_profile(altitudes)
+    SAC_temps = SAC_profile["temperature"]
+    SAC_pressures = SAC_profile["pressure"]
+    SAC_densities = SAC_profile["density"]
+    SAC_speeds_of_sound = SAC_profile["speed_of_sound"]
+    SAC_gravities = SAC_profile["gravity"]
 
-    LC_temps = [ap.temp_at_altitude(h, location_LC.ground_temperature, location_LC.local_T_lapse_rate) for h in altitudes]
-    LC_pressures = [ap.pressure_at_altitude(h, location_LC.ground_temperature, location_LC.ground_pressure, location_LC.local_T_lapse_rate, location_LC.local_gravity) for h in altitudes]
-    LC_densities = [ap.air_density_optimized(temp, location_LC.density_multiplier, location_LC.density_exponent) for temp in LC_temps]
-    LC_speeds_of_sound = [ap.speed_of_sound(temp) for temp in LC_temps]
-    LC_gravities = [get_local_gravity(location_LC.latitude, altitude) for altitude in altitudes]
+    LC_profile = location_LC.atmosphere_profile(altitudes)
+    LC_temps = LC_profile["temperature"]
+    LC_pressures = LC_profile["pressure"]
+    LC_densities = LC_profile["density"]
+    LC_speeds_of_sound = LC_profile["speed_of_sound"]
+    LC_gravities = LC_profile["gravity"]
 
     # plot them on the same graph
     fig, axs = plt.subplots(2, 3, figsize=(15, 10))
@@ -188,4 +658,4 @@ if __name__ == "__main__":
 
     axs[1, 2].axis("off")
 
-    plt.show()
\ No newline at end of file
+    plt.show()
@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+import aerodynamic_properties as aero
+from location_ensemble import LocationEnsemble
+
+# Largest number of (combination, trajectory point) pairs evaluated at once by a worker, to bound its memory use
+_MAX_BLOCK_SIZE = 2_000_000
+
+SWEEP_RESULTS = (
+    "max_dynamic_pressure",
+    "altitude_at_max_dynamic_pressure",
+    "max_mach_number",
+    "altitude_at_max_mach_number",
+    "max_reynolds_number",
+    "altitude_at_max_reynolds_number",
+)
+
+# Set in each worker process by _attach_trajectory
+_trajectory = None
+_trajectory_memory = None
+
+def _attach_trajectory(name, n_points):
+    # Map the trajectory in shared memory into this worker once, instead of pickling it with every task
+    global _trajectory, _trajectory_memory
+    _trajectory_memory = shared_memory.SharedMemory(name=name)
+    _trajectory = np.ndarray((2, n_points), dtype=float, buffer=_trajectory_memory.buf)
+
+def _sweep_chunk(combinations, elevation, latitude, len_characteristic):
+    altitudes, speeds = _trajectory
+    results = {name: np.empty(len(combinations)) for name in SWEEP_RESULTS}
+
+    block = max(1, _MAX_BLOCK_SIZE // len(altitudes))
+    for start in range(0, len(combinations), block):
+        chunk = combinations[start:start + block]
+        ensemble = LocationEnsemble(chunk[:, 0], chunk[:, 1], chunk[:, 2], elevation, latitude)
+        profile = ensemble.atmosphere_profile(altitudes)
+
+        quantities = {
+            "dynamic_pressure": aero.calculate_dynamic_pressure(profile["density"], speeds),
+            "mach_number": aero.calculate_mach_number(speeds, profile["speed_of_sound"]),
+            "reynolds_number": aero.calculate_reynolds_number(profile["density"], speeds, len_characteristic, profile["dynamic_viscosity"]),
+        }
+        rows = np.arange(len(chunk))
+        for name, values in quantities.items():
+            peak = np.argmax(values, axis=1)
+            results[f"max_{name}"][start:start + len(chunk)] = values[rows, peak]
+            results[f"altitude_at_max_{name}"][start:start + len(chunk)] = altitudes[peak]
+    return results
+
+def run_sweep(altitudes, speeds, ground_temperatures, ground_pressures, lapse_rates, elevation=0, latitude=40, len_characteristic=0.1, max_workers=None, chunk_size=None):
+    """
+    Find the worst-case aerodynamic loads along a trajectory for every combination of launch conditions, in parallel.
+
+    Every combination of ground temperature, ground pressure and lapse rate is evaluated along the same trajectory. The combinations are split across a process pool, and the trajectory is shared with the workers through shared memory rather than being copied to each of them.
+
+    Args
+    ----
+    altitudes : array_like
+        Altitudes above ground level of the trajectory in meters.
+    speeds : array_like
+        Airspeeds along the trajectory in m/s, same length as altitudes.
+    ground_temperatures : array_like
+        Ground-level temperatures to sweep, in degrees Celsius.
+    ground_pressures : array_like
+        Ground-level pressures to sweep, in Pascals.
+    lapse_rates : array_like
+        Temperature lapse rates to sweep, in Kelvin per meter.
+    elevation : float, optional
+        Elevation of the launch site in meters above sea level. Defaults to 0.
+    latitude : float, optional
+        Latitude of the launch site in degrees. Defaults to 40.
+    len_characteristic : float, optional
+        Characteristic length of the rocket for the Reynolds number, in meters. Defaults to 0.1.
+    max_workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+    chunk_size : int, optional
+        Number of combinations per task. Defaults to spreading the combinations evenly over about four tasks per worker.
+
+    Returns
+    -------
+    dict
+        Arrays with one value per combination:
+            - 'ground_temperature', 'ground_pressure', 'lapse_rate': the launch conditions of the combination
+            - 'max_dynamic_pressure' (Pa), 'max_mach_number', 'max_reynolds_number': peak values along the trajectory
+            - 'altitude_at_max_dynamic_pressure', 'altitude_at_max_mach_number', 'altitude_at_max_reynolds_number': altitude AGL in meters where each peak occurs
+    """
+    # Check the shapes before stacking, since np.array raises its own error for arrays of different lengths
+    altitudes = np.asarray(altitudes, dtype=float)
+    speeds = np.asarray(speeds, dtype=float)
+    if altitudes.ndim != 1 or altitudes.shape != speeds.shape:
+        raise ValueError("altitudes and speeds must be 1-D arrays of the same length")
+    if len(altitudes) == 0:
+        raise ValueError("the trajectory must have at least one point")
+    trajectory = np.array([altitudes, speeds])
+    combinations = np.array(list(product(ground_temperatures, ground_pressures, lapse_rates)), dtype=float).reshape(-1, 3)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(combinations) // (4 * max_workers)))
+
+    memory = shared_memory.SharedMemory(create=True, size=trajectory.nbytes)
+    try:
+        np.ndarray(trajectory.shape, dtype=float, buffer=memory.buf)[:] = trajectory
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_trajectory, initargs=(memory.name, trajectory.shape[1])) as executor:
+            futures = [
+                executor.submit(_sweep_chunk, combinations[start:start + chunk_size], elevation, latitude, len_characteristic)
+                for start in range(0, len(combinations), chunk_size)
+            ]
+            chunks = [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
+
+    results = {
+        "ground_temperature": combinations[:, 0],
+        "ground_pressure": combinations[:, 1],
+        "lapse_rate": combinations[:, 2],
+    }
+    for name in SWEEP_RESULTS:
+        results[name] = np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.empty(0)
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import locations
+
+    parser = argparse.ArgumentParser(description="Sweep historical launch conditions at a site and report the worst-case aerodynamic loads along a trajectory.")
+    parser.add_argument("trajectory", help="CSV file with a header row and 'altitude' (m AGL) and 'speed' (m/s) columns")
+    parser.add_argument("--site", choices=("SAC", "LC"), default="SAC", help="launch site (default: SAC)")
+    parser.add_argument("--length", type=float, default=0.1, help="characteristic length in meters (default: 0.1)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    with open(args.trajectory) as file:
+        header = [name.strip() for name in file.readline().split(",")]
+    data = np.loadtxt(args.trajectory, delimiter=",", skiprows=1, usecols=(header.index("altitude"), header.index("speed")), ndmin=2)
+
+    # Historical ranges from the notes in locations.py
+    if args.site == "SAC":
+        site = locations.location_SAC
+        temperatures = np.arange(25, 45.1, 1)
+        pressures = np.arange(86000, 86600.1, 50)
+        lapse_rates = np.arange(-0.0084, -0.0030, 0.0003)
+    else:
+        site = locations.location_LC
+        temperatures = np.arange(15, 30.1, 1)
+        pressures = np.arange(100000, 103000.1, 250)
+        lapse_rates = np.arange(-0.0080, -0.0050, 0.0003)
+
+    start = time.perf_counter()
+    results = run_sweep(data[:, 0], data[:, 1], temperatures, pressures, lapse_rates, site.elevation, site.latitude, args.length, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(results['ground_temperature'])} combinations in {elapsed:.2f} s")
+    for name in ("dynamic_pressure", "mach_number", "reynolds_number"):
+        worst = np.argmax(results[f"max_{name}"])
+        print(f"worst-case {name}: {results[f'max_{name}'][worst]:.6g} at {results[f'altitude_at_max_{name}'][worst]:.0f} m AGL "
+              f"(ground temperature {results['ground_temperature'][worst]:.1f} C, ground pressure {results['ground_pressure'][worst]:.0f} Pa, lapse rate {results['lapse_rate'][worst]:.5f} K/m)")
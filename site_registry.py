@@ -0,0 +1,182 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_SITES_FILE = Path(__file__).with_name("launch_sites.json")
+
+EARTH_MEAN_RADIUS = 6371.0088  # km, IUGG mean radius
+
+# Keys of a site's data that are passed to Location
+LOCATION_PARAMETERS = ("ground_temperature", "ground_pressure", "local_T_lapse_rate", "elevation", "latitude", "relative_humidity")
+
+def _haversine_distance(latitude, longitude, latitudes, longitudes):
+    # Great-circle distance in km, all angles in radians
+    sin_half_dlat = np.sin((latitudes - latitude) / 2)
+    sin_half_dlon = np.sin((longitudes - longitude) / 2)
+    a = sin_half_dlat**2 + np.cos(latitude) * np.cos(latitudes) * sin_half_dlon**2
+    return 2 * EARTH_MEAN_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class SiteRegistry:
+    """
+    A registry of launch sites (or other places, e.g. weather stations) loaded from a data file.
+
+    Location objects are only built when a site is first accessed, and are then reused. Sites can be searched by distance from a point with nearest and within, which use an index of the sites sorted by latitude so that only sites in a narrow band of latitudes are checked.
+
+    Each site is a dict with the Location parameters (ground_temperature in degrees Celsius, ground_pressure, and optionally local_T_lapse_rate, elevation, latitude and relative_humidity), a longitude in degrees (east positive) for the distance searches, and any other descriptive keys such as name and notes.
+    """
+    def __init__(self, sites=None):
+        """
+        Initialize a SiteRegistry object.
+
+        Parameters
+        ----------
+        sites : dict, optional
+            Site data keyed by site name. The default is an empty registry.
+        """
+        self._sites = {}
+        self._locations = {}
+        self._index = None
+        for key, data in (sites or {}).items():
+            self.register(key, **data)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_SITES_FILE):
+        """
+        Load a registry from a JSON or TOML file, whose top level maps site names to site data.
+
+        Parameters
+        ----------
+        path : str or path-like, optional
+            Path to the file. The format is chosen by the extension (.json or .toml). The default is launch_sites.json in this repository.
+
+        Returns
+        -------
+        SiteRegistry
+            The loaded registry.
+        """
+        path = Path(path)
+        if path.suffix.lower() == ".toml":
+            import tomllib
+            with open(path, "rb") as file:
+                return cls(tomllib.load(file))
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def register(self, key, **data):
+        """
+        Add a site to the registry, replacing any site with the same name.
+
+        Parameters
+        ----------
+        key : str
+            Name of the site.
+        **data
+            Site data, see SiteRegistry.
+        """
+        self._sites[key] = data
+        self._locations.pop(key, None)
+        self._index = None
+
+    def parameters(self, key):
+        """
+        Get the data of a site, without building its Location.
+        """
+        return self._sites[key]
+
+    def __getitem__(self, key):
+        """
+        Get the Location of a site, building it on first access.
+        """
+        if key not in self._locations:
+            from locations import Location
+
+            data = self._sites[key]
+            self._locations[key] = Location(**{name: data[name] for name in LOCATION_PARAMETERS if name in data})
+        return self._locations[key]
+
+    def __contains__(self, key):
+        return key in self._sites
+
+    def __iter__(self):
+        return iter(self._sites)
+
+    def __len__(self):
+        return len(self._sites)
+
+    def _build_index(self):
+        keys = [key for key, data in self._sites.items() if "latitude" in data and "longitude" in data]
+        latitudes = np.radians([self._sites[key]["latitude"] for key in keys])
+        longitudes = np.radians([self._sites[key]["longitude"] for key in keys])
+        order = np.argsort(latitudes)
+        self._index = (np.array(keys, dtype=object)[order], latitudes[order], longitudes[order])
+
+    def _band(self, latitude, half_width):
+        # Sites whose latitude is within half_width (radians) of latitude
+        if self._index is None:
+            self._build_index()
+        keys, latitudes, longitudes = self._index
+        start, stop = np.searchsorted(latitudes, [latitude - half_width, latitude + half_width], side="left")
+        return keys[start:stop], latitudes[start:stop], longitudes[start:stop]
+
+    def within(self, latitude, longitude, radius):
+        """
+        Find every site within a distance of a point.
+
+        Args
+        ----
+        latitude : float
+            Latitude of the point in degrees.
+        longitude : float
+            Longitude of the point in degrees.
+        radius : float
+            Search radius in km.
+
+        Returns
+        -------
+        list of tuple
+            (site name, distance in km) of each site within the radius, nearest first.
+        """
+        latitude, longitude = np.radians(latitude), np.radians(longitude)
+        # A site further than the radius in latitude alone can't be within the radius
+        keys, latitudes, longitudes = self._band(latitude, radius / EARTH_MEAN_RADIUS)
+        distances = _haversine_distance(latitude, longitude, latitudes, longitudes)
+        inside = np.flatnonzero(distances <= radius)
+        inside = inside[np.argsort(distances[inside])]
+        return [(keys[i], float(distances[i])) for i in inside]
+
+    def nearest(self, latitude, longitude, k=1):
+        """
+        Find the sites nearest to a point.
+
+        Args
+        ----
+        latitude : float
+            Latitude of the point in degrees.
+        longitude : float
+            Longitude of the point in degrees.
+        k : int, optional
+            Number of sites to find. Defaults to 1.
+
+        Returns
+        -------
+        list of tuple
+            (site name, distance in km) of the k nearest sites, nearest first. Fewer than k if the registry has fewer sites with coordinates.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, not {k}")
+        latitude, longitude = np.radians(latitude), np.radians(longitude)
+        # Widen a band of latitudes around the point until it holds k sites that are closer than any site outside of it can be
+        half_width = np.radians(1.0)
+        while True:
+            keys, latitudes, longitudes = self._band(latitude, half_width)
+            distances = _haversine_distance(latitude, longitude, latitudes, longitudes)
+            if len(keys) >= k:
+                nearest = np.argpartition(distances, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+                nearest = nearest[np.argsort(distances[nearest])]
+                if distances[nearest[-1]] <= half_width * EARTH_MEAN_RADIUS:
+                    return [(keys[i], float(distances[i])) for i in nearest]
+            if half_width >= np.pi:
+                nearest = np.argsort(distances)[:k]
+                return [(keys[i], float(distances[i])) for i in nearest]
+            half_width *= 2
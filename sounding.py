@@ -0,0 +1,262 @@
+import numpy as np
+
+import constants as con
+from locations import Location
+
+# Shortest average slice of sorted altitudes per segment for which thermodynamic_state loops over the segments instead of gathering coefficients by segment index
+_MIN_SLICE_SIZE = 256
+
+def load_sounding(path, altitude_column="altitude", temperature_column="temperature", delimiter=","):
+    """
+    Load altitude and temperature samples from a CSV file, e.g. a radiosonde sounding or a flight computer log.
+
+    Args
+    ----
+    path : str or path-like
+        Path to the CSV file. The first line must be a header with the column names.
+    altitude_column : str, optional
+        Name of the altitude column (meters). Defaults to 'altitude'.
+    temperature_column : str, optional
+        Name of the temperature column (degrees Celsius). Defaults to 'temperature'.
+    delimiter : str, optional
+        Column delimiter. Defaults to ','.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The altitudes and temperatures.
+    """
+    with open(path) as file:
+        header = [name.strip() for name in file.readline().split(delimiter)]
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=1, usecols=(header.index(altitude_column), header.index(temperature_column)), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+class SoundingLocation(Location):
+    """
+    A location whose temperature profile comes from measured temperature-vs-altitude samples instead of a single lapse rate.
+
+    Temperature is interpolated linearly between the samples. Pressure follows from the hydrostatic equation, whose integral of 1/T over each segment is exact for a linear temperature, and is accumulated over the samples once at construction. Queries then cost one np.searchsorted plus the partial integral over a single segment. Beyond the first and last samples, the first and last segments are extrapolated.
+
+    local_T_lapse_rate is a least-squares fit of a single lapse rate to the samples, for reference only. The attributes of Location that describe a single lapse rate (density_multiplier, density_exponent and the layer attributes) are None, since nearly isothermal soundings would make them overflow or divide by zero. atmosphere_profile, thermodynamic_state, temperature_at and altitude_at_pressure use the measured profile.
+
+    Attributes
+    ----------
+    sounding_altitudes : numpy.ndarray
+        Altitudes of the samples above ground level in meters, in increasing order.
+    sounding_temperatures : numpy.ndarray
+        Temperatures of the samples in Kelvin.
+    sounding_lapse_rates : numpy.ndarray
+        Lapse rate of each segment between samples in Kelvin per meter.
+    sounding_integrals : numpy.ndarray
+        Integral of 1/T with respect to altitude from ground level to each sample, in m/K.
+    """
+    def __init__(self, altitudes, temperatures, ground_pressure, elevation=0, latitude=40, altitudes_above_sea_level=False, relative_humidity=0):
+        """
+        Initialize a SoundingLocation object.
+
+        Parameters
+        ----------
+        altitudes : array_like
+            Altitudes of the temperature samples in meters, above ground level unless altitudes_above_sea_level is True. Need not be sorted; samples at repeated altitudes are averaged.
+        temperatures : array_like
+            Temperature samples in degrees Celsius.
+        ground_pressure : float
+            The pressure at ground level in Pascals.
+        elevation : float, optional
+            The elevation of the location in meters above sea level. The default is 0.
+        latitude : float, optional
+            The latitude of the location in degrees. The default is 40.
+        altitudes_above_sea_level : bool, optional
+            If True, the altitudes are above sea level (as in most radiosonde data) and are converted to altitudes above ground level. The default is False.
+        relative_humidity : float, optional
+            The relative humidity as a fraction (0 to 1), see Location. The default is 0 (dry air).
+        """
+        altitudes = np.asarray(altitudes, dtype=float)
+        temperatures = np.asarray(temperatures, dtype=float) + 273.15
+        if altitudes.ndim != 1 or altitudes.shape != temperatures.shape:
+            raise ValueError("altitudes and temperatures must be 1-D arrays of the same length")
+        if altitudes_above_sea_level:
+            altitudes = altitudes - elevation
+
+        levels, inverse = np.unique(altitudes, return_inverse=True)
+        if len(levels) < 2:
+            raise ValueError("a sounding needs samples at two or more different altitudes")
+        self.sounding_altitudes = levels
+        self.sounding_temperatures = np.bincount(inverse, weights=temperatures) / np.bincount(inverse)
+        self.sounding_lapse_rates = np.diff(self.sounding_temperatures) / np.diff(levels)
+
+        # ln(T / T_base) / lapse rate, the integral of 1/T over part of a segment, has a different form for isothermal segments. Both forms are added with per-segment weights that zero out the one that doesn't apply, so queries need no branching.
+        isothermal = self.sounding_lapse_rates == 0
+        self._inverse_lapse_rates = np.where(isothermal, 0.0, 1 / np.where(isothermal, 1.0, self.sounding_lapse_rates))
+        self._isothermal = isothermal.astype(float)
+
+        # Location gets the temperature at ground level (which need not be one of the samples) and a least-squares lapse rate
+        ground_temperature = float(self.temperature_at(0.0))
+        lapse_rate = float(np.polyfit(levels, self.sounding_temperatures, 1)[0])
+        super().__init__(ground_temperature - 273.15, ground_pressure, lapse_rate, elevation, latitude, relative_humidity)
+        self._pressure_scale = - self.local_gravity / con.R_specific_air
+
+        # Integrals of 1/T from the first sample to each sample, then moved to start from ground level
+        integrals = np.concatenate(([0.0], np.cumsum(self._partial_integral(np.arange(len(levels) - 1), np.diff(levels)))))
+        segment, height_in_segment = self._segment(0.0)
+        self.sounding_integrals = integrals - (integrals[segment] + self._partial_integral(segment, height_in_segment))
+
+        # Per-segment coefficients of ln(pressure) = base + slope * ln(1 + relative lapse rate * height in segment) + isothermal decay rate * height in segment
+        base_temperatures = self.sounding_temperatures[:-1]
+        self._relative_lapse_rates = self.sounding_lapse_rates / base_temperatures
+        self._log_pressure_bases = np.log(ground_pressure) + self._pressure_scale * self.sounding_integrals[:-1]
+        self._log_pressure_slopes = self._pressure_scale * self._inverse_lapse_rates
+        self._isothermal_decay_rates = self._pressure_scale * self._isothermal / base_temperatures
+        # The same coefficients as Python scalars, one tuple per segment, for sorted altitudes
+        self._segment_coefficients = list(zip(levels[:-1].tolist(), base_temperatures.tolist(), self.sounding_lapse_rates.tolist(), self._relative_lapse_rates.tolist(), self._log_pressure_bases.tolist(), self._log_pressure_slopes.tolist(), self._isothermal_decay_rates.tolist(), isothermal.tolist()))
+
+    def _init_density_constants(self):
+        # Only meaningful for a single lapse rate, whose power law overflows or divides by zero as the fitted lapse rate goes to zero
+        self.density_multiplier = None
+        self.density_exponent = None
+
+    def _init_layers(self):
+        # The sounding defines the whole profile, so there is no layered model
+        self.layer_base_altitudes = None
+        self.layer_lapse_rates = None
+        self.layer_base_temperatures = None
+        self.layer_base_pressures = None
+        self.layer_pressure_exponents = None
+        self.layer_pressure_decay_rates = None
+
+    def _segment(self, h):
+        # Index of the segment each altitude is in, and the height above the base of that segment. Searching only the interior samples puts altitudes below the first or above the last sample in the first or last segment.
+        segment = np.searchsorted(self.sounding_altitudes[1:-1], h, side="right")
+        return segment, h - self.sounding_altitudes.take(segment)
+
+    def _partial_integral(self, segment, height_in_segment):
+        # Integral of 1/T from the base of a segment to a height within it, exact for a linear temperature
+        base_temperature = self.sounding_temperatures.take(segment)
+        ratio = self.sounding_lapse_rates.take(segment) * height_in_segment / base_temperature
+        return np.log1p(ratio) * self._inverse_lapse_rates.take(segment) + height_in_segment / base_temperature * self._isothermal.take(segment)
+
+    def temperature_at(self, altitudes, layered=False):
+        """
+        Calculate the temperature at altitudes above ground level, interpolated from the sounding.
+
+        Parameters
+        ----------
+        altitudes : float or array_like
+            Altitudes above ground level in meters.
+        layered : bool, optional
+            Not supported, the sounding defines the whole profile.
+
+        Returns
+        -------
+        numpy.ndarray
+            Temperatures in Kelvin.
+        """
+        _check_not_layered(layered)
+        segment, height_in_segment = self._segment(np.asarray(altitudes, dtype=float))
+        return self.sounding_temperatures.take(segment) + self.sounding_lapse_rates.take(segment) * height_in_segment
+
+    def thermodynamic_state(self, altitudes, temperature, pressure, density, layered=False, geopotential=False, vapor_pressure=None):
+        """
+        Calculate temperature, pressure and density from the sounding, writing them into preallocated arrays. See Location.thermodynamic_state.
+        """
+        _check_not_layered(layered)
+        altitudes = np.asarray(altitudes, dtype=float)
+        if geopotential:
+            altitudes = self.geopotential_altitude(altitudes)
+
+        bounds = self._sorted_segment_bounds(altitudes)
+        if bounds is None:
+            self._gathered_state(altitudes, temperature, pressure)
+        else:
+            self._sliced_state(altitudes, temperature, pressure, bounds)
+
+        if self.relative_humidity:
+            self._moist_density(temperature, pressure, density, vapor_pressure)
+        else:
+            np.multiply(temperature, con.R_specific_air, out=density)
+            np.divide(pressure, density, out=density)
+
+    def _sorted_segment_bounds(self, altitudes):
+        # Start of each segment's slice of sorted altitudes, or None if the altitudes aren't sorted or the slices are too short to pay for a Python loop over them
+        if altitudes.ndim != 1 or len(altitudes) < _MIN_SLICE_SIZE or not (altitudes[1:] >= altitudes[:-1]).all():
+            return None
+        # Same segments as _segment, whose searchsorted puts an altitude equal to an interior sample in the segment above it
+        bounds = [0, *np.searchsorted(altitudes, self.sounding_altitudes[1:-1], side="left").tolist(), len(altitudes)]
+        slices = sum(start < stop for start, stop in zip(bounds[:-1], bounds[1:]))
+        return bounds if len(altitudes) >= _MIN_SLICE_SIZE * slices else None
+
+    def _sliced_state(self, altitudes, temperature, pressure, bounds):
+        # One slice of altitudes per segment, with scalar coefficients instead of arrays gathered by segment index. Same arithmetic as _gathered_state, so both give identical results.
+        for coefficients, start, stop in zip(self._segment_coefficients, bounds[:-1], bounds[1:]):
+            if start == stop:
+                continue
+            base_altitude, base_temperature, lapse_rate, relative_lapse_rate, log_pressure_base, log_pressure_slope, isothermal_decay_rate, isothermal = coefficients
+
+            # The pressure slice holds the height in the segment, then ln(pressure), until it is overwritten by the pressure
+            log_pressure = pressure[start:stop]
+            np.subtract(altitudes[start:stop], base_altitude, out=log_pressure)
+            segment_temperature = temperature[start:stop]
+            np.multiply(log_pressure, lapse_rate, out=segment_temperature)
+            segment_temperature += base_temperature
+
+            if isothermal:
+                log_pressure *= isothermal_decay_rate
+            else:
+                log_pressure *= relative_lapse_rate
+                np.log1p(log_pressure, out=log_pressure)
+                log_pressure *= log_pressure_slope
+            log_pressure += log_pressure_base
+            np.exp(log_pressure, out=log_pressure)
+
+    def _gathered_state(self, altitudes, temperature, pressure):
+        segment, height_in_segment = self._segment(altitudes)
+
+        np.multiply(self.sounding_lapse_rates.take(segment), height_in_segment, out=temperature)
+        temperature += self.sounding_temperatures.take(segment)
+
+        # ln(pressure) from the cumulative integral of 1/T to the base of the segment plus the part of the segment below the altitude
+        log_pressure = np.log1p(self._relative_lapse_rates.take(segment) * height_in_segment)
+        log_pressure *= self._log_pressure_slopes.take(segment)
+        isothermal_decay = self._isothermal_decay_rates.take(segment)
+        isothermal_decay *= height_in_segment
+        log_pressure += isothermal_decay
+        log_pressure += self._log_pressure_bases.take(segment)
+        np.exp(log_pressure, out=pressure)
+
+    def altitude_at_pressure(self, pressures, layered=False):
+        """
+        Calculate the altitude above ground level at which the sounding's atmosphere has a given pressure. See Location.altitude_at_pressure.
+        """
+        _check_not_layered(layered)
+        # The integral of 1/T increases with altitude, so the segment can be found by searching the cumulative integrals
+        integral = np.log(np.asarray(pressures, dtype=float) / self.ground_pressure) / self._pressure_scale
+        segment = np.searchsorted(self.sounding_integrals[1:-1], integral, side="right")
+        integral_in_segment = integral - self.sounding_integrals.take(segment)
+        base_temperature = self.sounding_temperatures.take(segment)
+        # Inverse of the integral over a segment with a linear temperature
+        relative_height = np.expm1(self.sounding_lapse_rates.take(segment) * integral_in_segment) * self._inverse_lapse_rates.take(segment) + integral_in_segment * self._isothermal.take(segment)
+        return self.sounding_altitudes.take(segment) + base_temperature * relative_height
+
+    def cursor(self, tolerance=1e-9):
+        """
+        Not supported, since AtmosphereCursor relies on a single lapse rate. Use tabulate for fast repeated queries instead.
+        """
+        raise ValueError("AtmosphereCursor needs a single lapse rate; use SoundingLocation.tabulate for fast repeated queries")
+
+    def atmosphere_jacobian(self, altitudes, out=None):
+        """
+        Not supported, since the derivatives of Location.atmosphere_jacobian are those of a single lapse rate, which a sounding doesn't have.
+        """
+        raise ValueError("atmosphere_jacobian needs a single lapse rate, which a SoundingLocation doesn't have")
+
+    @classmethod
+    def from_file(cls, path, ground_pressure, elevation=0, latitude=40, altitudes_above_sea_level=False, altitude_column="altitude", temperature_column="temperature", delimiter=",", relative_humidity=0):
+        """
+        Create a SoundingLocation from a CSV file of altitude and temperature samples. See load_sounding and SoundingLocation for the parameters.
+        """
+        altitudes, temperatures = load_sounding(path, altitude_column, temperature_column, delimiter)
+        return cls(altitudes, temperatures, ground_pressure, elevation, latitude, altitudes_above_sea_level, relative_humidity)
+
+def _check_not_layered(layered):
+    if layered:
+        raise ValueError("the layered model isn't available for a SoundingLocation, whose sounding defines the whole profile")
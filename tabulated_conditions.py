@@ -0,0 +1,188 @@
+import csv
+from pathlib import Path
+
+import numpy as np
+
+import constants as con
+
+# Columns of the generated tables, in the same order as the sheets of Tabulated Conditions.xlsx
+COLUMNS = (
+    "altitude_m_AGL",
+    "altitude_ft_AGL",
+    "altitude_m_ASL",
+    "temperature_K",
+    "temperature_C",
+    "gravity_m_per_s2",
+    "pressure_Pa",
+    "pressure_kPa",
+    "density_kg_per_m3",
+    "speed_of_sound_m_per_s",
+    "dynamic_viscosity_kg_per_m_s",
+)
+
+# The altitude grid of Tabulated Conditions.xlsx: 0 to 10700 m AGL every 50 m
+DEFAULT_ALTITUDES = np.arange(0, 10701, 50)
+
+def generate_conditions_table(location, altitudes=DEFAULT_ALTITUDES, layered=False):
+    """
+    Generate a table of the atmospheric conditions at a location at different altitudes.
+
+    Args
+    ----
+    location : Location
+        The location to tabulate.
+    altitudes : array_like, optional
+        Altitudes above ground level in meters. Defaults to the grid of Tabulated Conditions.xlsx (0 to 10700 m every 50 m).
+    layered : bool, optional
+        If True, use the layered atmosphere model. Defaults to False.
+
+    Returns
+    -------
+    dict
+        One array per column, keyed by the names in COLUMNS.
+    """
+    altitudes = np.asarray(altitudes, dtype=float)
+    profile = location.atmosphere_profile(altitudes, layered=layered)
+    return {
+        "altitude_m_AGL": altitudes,
+        "altitude_ft_AGL": altitudes * con.m_to_ft_conversion,
+        "altitude_m_ASL": altitudes + location.elevation,
+        "temperature_K": profile["temperature"],
+        "temperature_C": profile["temperature"] - 273.15,
+        "gravity_m_per_s2": profile["gravity"],
+        "pressure_Pa": profile["pressure"],
+        "pressure_kPa": profile["pressure"] / 1000,
+        "density_kg_per_m3": profile["density"],
+        "speed_of_sound_m_per_s": profile["speed_of_sound"],
+        "dynamic_viscosity_kg_per_m_s": profile["dynamic_viscosity"],
+    }
+
+def export_npz(table, path):
+    """
+    Write a table to a NumPy .npz archive, with one array per column. Load it with np.load(path).
+    """
+    np.savez(path, **table)
+
+def export_csv(table, path):
+    """
+    Write a table to a CSV file with a header row of column names, in one bulk write.
+    """
+    np.savetxt(path, np.column_stack(list(table.values())), delimiter=",", header=",".join(table), comments="", fmt="%.10g")
+
+def export_parquet(table, path):
+    """
+    Write a table to a Parquet file. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Exporting to Parquet requires pyarrow (pip install pyarrow)") from error
+    pq.write_table(pa.table(table), path)
+
+def export_arrow(table, path):
+    """
+    Write a table to an Arrow IPC (Feather) file, which can be memory-mapped when read. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError as error:
+        raise ImportError("Exporting to Arrow requires pyarrow (pip install pyarrow)") from error
+    feather.write_feather(pa.table(table), path)
+
+def export_xlsx(tables, path):
+    """
+    Write tables to an Excel workbook, with one sheet per table. Requires openpyxl.
+
+    Args
+    ----
+    tables : dict
+        Tables keyed by sheet name, e.g. {'SAC': ..., 'LC': ...}.
+    path : str or path-like
+        Path of the workbook to write.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as error:
+        raise ImportError("Exporting to Excel requires openpyxl (pip install openpyxl)") from error
+
+    # Write-only mode streams rows to the file instead of building every cell in memory
+    workbook = Workbook(write_only=True)
+    for sheet_name, table in tables.items():
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(list(table))
+        for row in np.column_stack(list(table.values())).tolist():
+            sheet.append(row)
+    workbook.save(path)
+
+_exporters = {
+    ".npz": export_npz,
+    ".csv": export_csv,
+    ".parquet": export_parquet,
+    ".arrow": export_arrow,
+    ".feather": export_arrow,
+}
+
+def export_table(table, path):
+    """
+    Write a table to a file, in the format given by the file extension: .npz, .csv, .parquet, or .arrow/.feather.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in _exporters:
+        raise ValueError(f"unsupported file extension {suffix!r}, use one of {sorted(_exporters)}")
+    _exporters[suffix](table, path)
+
+def load_table(path):
+    """
+    Load a table written by export_table.
+
+    Returns
+    -------
+    dict
+        One array per column, keyed by column name.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".npz":
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+    if suffix == ".csv":
+        with open(path, newline="") as file:
+            header = next(csv.reader(file))
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        return {name: data[:, i] for i, name in enumerate(header)}
+    if suffix in (".parquet", ".arrow", ".feather"):
+        try:
+            import pyarrow.feather as feather
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Loading Parquet or Arrow files requires pyarrow (pip install pyarrow)") from error
+        arrow_table = pq.read_table(path) if suffix == ".parquet" else feather.read_table(path, memory_map=True)
+        return {name: arrow_table.column(name).to_numpy() for name in arrow_table.column_names}
+    raise ValueError(f"unsupported file extension {suffix!r}")
+
+if __name__ == "__main__":
+    import argparse
+
+    from locations import location_SAC, location_LC
+
+    parser = argparse.ArgumentParser(description="Regenerate the tables of atmospheric conditions at SAC and LC.")
+    parser.add_argument("output_dir", nargs="?", default="tabulated_conditions", help="directory to write the tables to")
+    parser.add_argument("--format", default="csv", choices=sorted(ext.lstrip(".") for ext in _exporters) + ["xlsx"], help="output format (default: csv)")
+    parser.add_argument("--step", type=float, default=50, help="altitude step in meters (default: 50)")
+    parser.add_argument("--ceiling", type=float, default=10700, help="highest altitude AGL in meters (default: 10700)")
+    args = parser.parse_args()
+
+    altitudes = np.arange(0, args.ceiling + args.step / 2, args.step)
+    tables = {
+        "SAC": generate_conditions_table(location_SAC, altitudes),
+        "LC": generate_conditions_table(location_LC, altitudes),
+    }
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if args.format == "xlsx":
+        export_xlsx(tables, output_dir / "Tabulated Conditions.xlsx")
+    else:
+        for name, table in tables.items():
+            export_table(table, output_dir / f"{name}.{args.format}")